@@ -1,24 +1,37 @@
 import nuke
-from PySide2 import QtWidgets
-from functools import partial
+from PySide2 import QtWidgets, QtCore
+import V_layer_catalog
+import V_instrument
+import V_dialog_manager
+from V_batch_edit import BatchEdit, set_knob
 
 class ChannelButtonPanel(QtWidgets.QDialog):
-    def __init__(self, node, parent=None):  # Fixed method name
+    def __init__(self, node=None, parent=None):  # Fixed method name
         super(ChannelButtonPanel, self).__init__(parent)  # Fixed method name
         self.setWindowTitle("Select Channel")
-        self.node = node
+        self.node = None
 
         # Layout setup
         self.layout = QtWidgets.QVBoxLayout()
 
-        # Get channels and create buttons
-        channels = self.get_channels()
-        self.buttons = []
-        for channel in channels:
-            button = QtWidgets.QPushButton(channel)
-            button.clicked.connect(partial(self.select_channel, channel))
-            self.layout.addWidget(button)
-            self.buttons.append(button)
+        # Type-ahead filter backed by the catalog's prefix/substring index
+        self.layer_index = V_layer_catalog.LayerNameIndex([])
+        self.filter_input = QtWidgets.QLineEdit()
+        self.filter_input.setPlaceholderText("Filter layers...")
+        self.filter_input.textChanged.connect(self.apply_filter)
+        self.filter_input.returnPressed.connect(self.select_current)
+        self.layout.addWidget(self.filter_input)
+
+        # A model/view list only paints the visible rows, so opening stays
+        # quick even with thousands of layers
+        self.model = QtCore.QStringListModel()
+        self.view = QtWidgets.QListView()
+        self.view.setModel(self.model)
+        self.view.setUniformItemSizes(True)
+        self.view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.view.clicked.connect(self.select_index)
+        self.view.activated.connect(self.select_index)
+        self.layout.addWidget(self.view)
 
         # Add a cancel button
         self.cancel_button = QtWidgets.QPushButton("Cancel")
@@ -27,27 +40,54 @@ class ChannelButtonPanel(QtWidgets.QDialog):
 
         self.setLayout(self.layout)
         self.setMinimumSize(250, 400)
+        if node is not None:
+            self.set_node(node)
+
+    def set_node(self, node):
+        # The dialog is reused, so point it at node and start with an empty filter
+        self.node = node
+        self.layer_index = V_layer_catalog.get_layer_index(node)
+        self.filter_input.blockSignals(True)
+        self.filter_input.clear()
+        self.filter_input.blockSignals(False)
+        self.model.setStringList(self.get_channels())
+        self.filter_input.setFocus()
 
     def get_channels(self):
-        # Retrieve all channels from the node
-        channels = self.node.channels()
+        # Unique base layer names (e.g. "rgb", "alpha") from the shared catalog,
+        # with 'rgb' and 'alpha' first and the rest sorted alphabetically
+        return list(self.layer_index.layers)
+
+    def apply_filter(self, text):
+        # Show only the layers matching the typed text, keeping priority order
+        self.model.setStringList(self.layer_index.search(text))
+        if self.model.rowCount():
+            self.view.setCurrentIndex(self.model.index(0))
 
-        # Extract unique base layer names without individual channels (e.g., only "rgb", "alpha")
-        unique_layers = list(dict.fromkeys([ch.split('.')[0] for ch in channels]))
+    def select_index(self, index):
+        # clicked and activated can both fire for one click, only handle the first
+        if self.isVisible():
+            self.select_channel(self.model.data(index, QtCore.Qt.DisplayRole))
 
-        # Custom sort: prioritize 'rgb' and 'alpha', then sort remaining layers alphabetically
-        priority_layers = ["rgb", "rgba", "alpha"]
-        sorted_layers = sorted(unique_layers, key=lambda x: (x not in priority_layers, x))
-        return sorted_layers
+    def select_current(self):
+        # Enter in the filter picks the highlighted (or first) match
+        index = self.view.currentIndex()
+        if not index.isValid() and self.model.rowCount():
+            index = self.model.index(0)
+        if index.isValid():
+            self.select_index(index)
 
+    @V_instrument.instrumented("Shuffle_shift.select_channel")
     def select_channel(self, channel):
         # Set the selected channel based on the node type
-        if self.node.Class() == "Shuffle":
-            self.node['in'].setValue(channel)
-        elif self.node.Class() == "Shuffle2":
-            self.node['in1'].setValue(channel)
+        with BatchEdit("Shuffle Shift"):
+            if self.node.Class() == "Shuffle":
+                set_knob(self.node, 'in', channel)
+            elif self.node.Class() == "Shuffle2":
+                set_knob(self.node, 'in1', channel)
         self.accept()
 
+@V_instrument.instrumented()
 def select_channel_for_shuffle():
     # Ensure a Shuffle or Shuffle2 node is selected
     try:
@@ -59,7 +99,9 @@ def select_channel_for_shuffle():
         nuke.message("Please select a Shuffle or Shuffle2 node.")
         return
 
-    panel = ChannelButtonPanel(node)  # Create the dialog with the selected node
+    # One dialog per session, parented to Nuke's main window and reused
+    panel = V_dialog_manager.get_dialog("shuffle_shift", ChannelButtonPanel)
+    panel.set_node(node)
     if panel.exec_():  # Show the dialog and wait for a result
         pass
     else:
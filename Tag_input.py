@@ -1,16 +1,93 @@
+import re
 import nuke
+import V_instrument
+from V_batch_edit import BatchEdit, set_knob
+
+# Used numeric suffixes per base name, e.g. {"Tag_input": {1, 2, 5}}.
+# Filled lazily by a single scan of the script and kept in sync by callbacks.
+_name_index = {}
+# Lowest suffix per base name that might still be free
+_next_free = {}
+_callbacks_registered = False
+
+_NAME_SUFFIX_RE = re.compile(r"^(.*?)([1-9]\d*)$")
+
+def _split_name(name):
+    """Split 'Tag_input12' into ('Tag_input', 12), or (None, None) if there is no suffix."""
+    match = _NAME_SUFFIX_RE.match(name)
+    if not match:
+        return None, None
+    return match.group(1), int(match.group(2))
+
+def _index_base_name(base_name):
+    """Scan the script once and record every suffix already used by base_name."""
+    used = set()
+    for node in nuke.allNodes():
+        base, suffix = _split_name(node.name())
+        if base == base_name:
+            used.add(suffix)
+    _name_index[base_name] = used
+    _next_free[base_name] = 1
+    return used
+
+def _reset_name_index():
+    _name_index.clear()
+    _next_free.clear()
+
+def _on_node_created():
+    node = nuke.thisNode()
+    base, suffix = _split_name(node.name())
+    used = _name_index.get(base)
+    if used is not None:
+        used.add(suffix)
+    if is_tag_input(node):
+        _track_tag(node)
+    else:
+        _track_target(node)  # A dangling target may have just appeared
+
+def _on_node_destroyed():
+    base, suffix = _split_name(nuke.thisNode().name())
+    used = _name_index.get(base)
+    if used is not None:
+        used.discard(suffix)
+        if suffix < _next_free[base]:
+            _next_free[base] = suffix
+
+def register_callbacks():
+    """Install the Nuke callbacks that keep the name and tag indexes in sync with the script."""
+    global _callbacks_registered
+    if _callbacks_registered:
+        return
+    nuke.addOnCreate(_on_node_created)
+    nuke.addOnDestroy(_on_node_destroyed)
+    nuke.addKnobChanged(_on_knob_changed)
+    nuke.addOnScriptLoad(_reset_name_index)
+    nuke.addOnScriptClose(_reset_name_index)
+    nuke.addOnScriptLoad(_rebuild_tag_index)
+    nuke.addOnScriptClose(_clear_tag_index)
+    _callbacks_registered = True
+    # Renames are only traceable once the index exists, so build it up front
+    _get_tag_index()
 
 # Function to generate a unique name based on existing nodes
 def generate_unique_name(base_name):
-    i = 1
-    while nuke.exists(f"{base_name}{i}"):
+    used = _name_index.get(base_name)
+    if used is None:
+        used = _index_base_name(base_name)
+    i = _next_free[base_name]
+    # The index is authoritative for skipping, one nuke.exists() confirms the pick
+    while i in used or nuke.exists(f"{base_name}{i}"):
+        used.add(i)
         i += 1
+    _next_free[base_name] = i
     return f"{base_name}{i}"
 
 # Function to create the 'Tag_input' NoOp node with a unique name
-def create_tag_input_node():
-    # Generate a unique name based on existing nodes
-    unique_name = generate_unique_name("Tag_input")
+@V_instrument.instrumented()
+def create_tag_input_node(all_selected=False):
+    # Batch mode: tag every selected node in one go
+    if all_selected:
+        return create_tag_input_nodes(nuke.selectedNodes())
 
     # Get the selected node's name, or set it to an empty string if none is selected
     try:
@@ -19,27 +96,95 @@ def create_tag_input_node():
     except:
         sel_node_name = ' '  # If no node is selected, use a blank string
 
-    # Create a NoOp node with the unique name and set properties
-    n = nuke.nodes.NoOp(name=unique_name)
-    n['tile_color'].setValue(11384831)  # Custom color
-    n['label'].setValue('[value nc]')    # Display the connection name dynamically
-    n['note_font'].setValue('Bitstream Vera Sans Bold')  # Font for the note
+    return new_tag_input(sel_node_name)
+
+# Function to create one 'Tag_input' pointing at target_name, without any UI
+def new_tag_input(target_name=' '):
+    with BatchEdit("Create Tag_input"):
+        # Generate a unique name based on existing nodes
+        return build_tag_input_node(generate_unique_name("Tag_input"), target_name)
+
+# Function to tag the selected nodes, telling the user when there are none
+def create_tag_input_nodes(nodes):
+    tags = tag_nodes(nodes)
+    if not tags:
+        nuke.message("No nodes selected!")
+    return tags
+
+# Function to tag several nodes at once inside a single undo group, without any UI
+def tag_nodes(nodes):
+    nodes = [n for n in nodes if n.Class() != "BackdropNode"]
+    tags = []
+    if not nodes:
+        return tags
+
+    with BatchEdit("Tag selected nodes"):
+        for node in nodes:
+            tag = build_tag_input_node(generate_unique_name("Tag_input"), node.name())
+            tag.setInput(0, node)
+            tag.setXYpos(node.xpos(), node.ypos() + 60)  # Park the tag just below its parent
+            tags.append(tag)
+    return tags
+
+# Function to build the one-line script a Tag_input button runs
+def _knob_call(func_name):
+    return f"import {__name__}; {__name__}.{func_name}()"
+
+# Function to point a tag at target_name and refresh its static label
+def set_tag_target(tag, target_name):
+    set_knob(tag, 'nc', target_name)
+    set_knob(tag, 'label', target_name.strip())
+
+# 'Get name' button: store the selected node's name on the tag
+def fetch_selected_name(tag=None):
+    tag = tag or nuke.thisNode()
+    try:
+        sel_node = nuke.selectedNode()
+    except ValueError:
+        nuke.message("No node selected!")
+        return
+    with BatchEdit("Get name"):
+        set_tag_target(tag, sel_node.name())
+
+# 'Connect' button: wire the tag to the node named in 'nc'
+def connect_tag(tag=None):
+    tag = tag or nuke.thisNode()
+    node_name = tag['nc'].value()
+    target_node = nuke.toNode(node_name) if node_name.strip() else None
+    if target_node:
+        tag.setInput(0, target_node)
+    else:
+        nuke.message("Node not found or invalid name!")
+
+# 'Jump to Input' button: zoom the DAG to the node named in 'nc'
+def jump_to_input(tag=None):
+    tag = tag or nuke.thisNode()
+    nc_name = tag['nc'].value()
+    target_node = nuke.toNode(nc_name) if nc_name.strip() else None
+    if target_node:
+        nuke.zoom(2, [target_node.xpos(), target_node.ypos()])
+    else:
+        nuke.message("Target node not found or invalid!")
+
+# Function to build a single 'Tag_input' node pointing at sel_node_name
+def build_tag_input_node(unique_name, sel_node_name):
+    # Create a NoOp node with the unique name and its properties set as part
+    # of creation, so no knobChanged fires for them
+    n = nuke.nodes.NoOp(
+        name=unique_name,
+        tile_color=11384831,  # Custom color
+        label=sel_node_name.strip(),  # Static label, rewritten whenever 'nc' changes
+        note_font='Bitstream Vera Sans Bold',  # Font for the note
+    )
 
     # Add an EvalString knob to display the selected input's name
     conn_name_knob = nuke.EvalString_Knob('nc', 'Connection name', sel_node_name)
     conn_name_knob.setFlag(nuke.STARTLINE)
     n.addKnob(conn_name_knob)
 
-    # Add a button to fetch and update the selected node's name
-    get_name_knob = nuke.PyScript_Knob('get_name', 'Get name')
-    get_name_knob.setValue('''
-try:
-    sel_node = nuke.selectedNode()
-    current_node = nuke.thisNode()
-    current_node['nc'].setValue(sel_node.name())
-except:
-    nuke.message("No node selected!")
-''')
+    # Buttons call into this module rather than carrying their own source,
+    # which keeps every tag small in the saved script
+    get_name_knob = nuke.PyScript_Knob('get_name', 'Get name', _knob_call('fetch_selected_name'))
     get_name_knob.setFlag(nuke.STARTLINE)
     n.addKnob(get_name_knob)
 
@@ -49,31 +194,216 @@ except:
     n.addKnob(help_text_knob)
 
     # Add a button to connect to the node specified in 'nc'
-    connect_knob = nuke.PyScript_Knob('connect', 'Connect')
-    connect_knob.setValue('''
-tn = nuke.thisNode()
-node_name = tn['nc'].value()
-target_node = nuke.toNode(node_name) if node_name.strip() else None
-if target_node:
-    tn.setInput(0, target_node)
-else:
-    nuke.message("Node not found or invalid name!")
-''')
+    connect_knob = nuke.PyScript_Knob('connect', 'Connect', _knob_call('connect_tag'))
     connect_knob.setFlag(nuke.STARTLINE)
     n.addKnob(connect_knob)
 
     # Add a button to zoom in on the connected node
-    view_input_knob = nuke.PyScript_Knob('view_input_node', 'Jump to Input')
-    view_input_knob.setValue('''
-nc_name = nuke.thisNode()['nc'].value()
-target_node = nuke.toNode(nc_name) if nc_name.strip() else None
-if target_node:
-    nuke.zoom(2, [target_node.xpos(), target_node.ypos()])
-else:
-    nuke.message("Target node not found or invalid!")
-''')
+    view_input_knob = nuke.PyScript_Knob('view_input_node', 'Jump to Input', _knob_call('jump_to_input'))
     view_input_knob.setFlag(nuke.STARTLINE)
     n.addKnob(view_input_knob)
 
+    # onCreate fired before 'nc' existed, so index the finished tag here
+    _track_tag(n)
+    return n
+
+# Function to tell Tag_input nodes apart from ordinary NoOps
+def is_tag_input(node):
+    return node.Class() == "NoOp" and node.knob('nc') is not None
+
+class TagRegistry(object):
+    """Maps each 'nc' target name to the Tag_input nodes pointing at it.
+
+    Built in a single pass over nuke.allNodes(), which also records every node by
+    name so targets resolve without one nuke.toNode() call per tag.
+    """
+
+    def __init__(self):
+        self.tags_by_target = {}
+        self.nodes_by_name = {}
+        for node in nuke.allNodes():
+            self.nodes_by_name[node.name()] = node
+            if is_tag_input(node):
+                target_name = node['nc'].value().strip()
+                self.tags_by_target.setdefault(target_name, []).append(node)
+
+    def target_of(self, tag):
+        """Returns the node a tag points at, or None if it is dangling."""
+        return self.nodes_by_name.get(tag['nc'].value().strip())
+
+    def tags_for(self, target_name):
+        """Returns the Tag_input nodes whose 'nc' is target_name."""
+        return list(self.tags_by_target.get(target_name, []))
+
+    def dangling_tags(self):
+        """Returns the Tag_input nodes whose target is blank or missing."""
+        return [tag
+                for target_name, tags in self.tags_by_target.items()
+                if target_name not in self.nodes_by_name
+                for tag in tags]
+
+# Tag_input nodes by the target name in their 'nc' knob, kept current by callbacks.
+# Entries are re-checked against 'nc' when used, so stale ones are simply skipped.
+_tags_by_target = None
+# Node object last seen under each target name. Its name() follows renames,
+# which is how a rename is traced back to the name the tags still carry.
+_target_nodes = {}
+
+def _rebuild_tag_index():
+    global _tags_by_target
+    _tags_by_target = None
+    _target_nodes.clear()
+    _get_tag_index()
+
+def _clear_tag_index():
+    global _tags_by_target
+    _tags_by_target = {}
+    _target_nodes.clear()
+
+def _get_tag_index():
+    global _tags_by_target
+    if _tags_by_target is None:
+        registry = TagRegistry()
+        _tags_by_target = registry.tags_by_target
+        for target_name in _tags_by_target:
+            target_node = registry.nodes_by_name.get(target_name)
+            if target_node is not None:
+                _target_nodes[target_name] = target_node
+    return _tags_by_target
+
+def _node_name(node):
+    try:
+        return node.name()
+    except ValueError:
+        return None  # Node has been deleted
+
+def _track_tag(tag):
+    if _tags_by_target is None:
+        return  # Not indexed yet, the first lookup scans the script
+    target_name = tag['nc'].value().strip()
+    bucket = _tags_by_target.setdefault(target_name, [])
+    tag_name = tag.name()
+    if all(_node_name(t) != tag_name for t in bucket):
+        bucket.append(tag)
+    if target_name and target_name not in _target_nodes:
+        _track_target(nuke.toNode(target_name))
+
+def _track_target(node):
+    if node is not None and _tags_by_target is not None and node.name() in _tags_by_target:
+        _target_nodes[node.name()] = node
+
+def _renamed_from(old_name, new_name):
+    target_node = _target_nodes.get(old_name)
+    return old_name != new_name and target_node is not None and _node_name(target_node) == new_name
+
+def _on_knob_changed():
+    knob = nuke.thisKnob()
+    if knob is None:
+        return
+    if knob.name() == 'name':
+        _on_node_renamed(nuke.thisNode())
+    elif knob.name() == 'nc':
+        node = nuke.thisNode()
+        if is_tag_input(node):
+            set_knob(node, 'label', knob.value().strip())
+            _track_tag(node)
+
+def _on_node_renamed(node):
+    new_name = node.name()
+    base, suffix = _split_name(new_name)
+    used = _name_index.get(base)
+    if used is not None:
+        used.add(suffix)
+
+    if is_tag_input(node):
+        _track_tag(node)
+        return
+
+    _get_tag_index()
+    # Fast path: tags wired to the node carry its old name in 'nc'
+    old_names = set()
+    for dep in node.dependent(nuke.INPUTS | nuke.HIDDEN_INPUTS, forceEvaluate=False):
+        if is_tag_input(dep):
+            old_name = dep['nc'].value().strip()
+            if _renamed_from(old_name, new_name):
+                old_names.add(old_name)
+    # No wired tags: check the tagged targets only, never the whole script
+    if not old_names:
+        old_names = set(n for n in list(_target_nodes) if _renamed_from(n, new_name))
+    for old_name in old_names:
+        retarget_tags(old_name, new_name)
+
+# Function to point every tag aimed at old_name to new_name
+def retarget_tags(old_name, new_name):
+    index = _get_tag_index()
+    moved = []
+    for tag in index.pop(old_name, []):
+        if _node_name(tag) is None or tag['nc'].value().strip() != old_name:
+            continue  # Deleted, or already retargeted by hand
+        set_tag_target(tag, new_name)
+        moved.append(tag)
+
+    bucket = index.setdefault(new_name, [])
+    known = set(_node_name(t) for t in bucket)
+    bucket.extend(t for t in moved if t.name() not in known)
+    if old_name in _target_nodes:
+        _target_nodes[new_name] = _target_nodes.pop(old_name)
+    return moved
+
+# Function to reconnect every Tag_input in the script in one undo step
+@V_instrument.instrumented()
+def reconnect_all_tags(show_report=True):
+    registry = TagRegistry()
+    connected = 0
+
+    with BatchEdit("Reconnect all tags") as batch:
+        for target_name, tags in registry.tags_by_target.items():
+            target_node = registry.nodes_by_name.get(target_name)
+            for tag in tags:
+                # Tags from older versions evaluate '[value nc]' on every redraw
+                if tag['label'].value() == '[value nc]':
+                    batch.set(tag, 'label', target_name)
+                if target_node is None:
+                    continue
+                current = tag.input(0)
+                # Only touch tags that are not already wired to their target
+                if current is None or current.name() != target_name:
+                    tag.setInput(0, target_node)
+                    connected += 1
+        batch.update_ui()
+
+    dangling = registry.dangling_tags()
+    if show_report and dangling:
+        nuke.message("Reconnected {} tag(s). Dangling tags:\n{}".format(
+            connected, "\n".join(sorted(tag.name() for tag in dangling))))
+    return connected, dangling
+
+# Function to list the Tag_input nodes pointing at a node
+def find_tags_for_node(node):
+    return TagRegistry().tags_for(node.name())
+
+# Function to list Tag_input nodes whose target is missing
+def find_dangling_tags():
+    return TagRegistry().dangling_tags()
+
+# Function to select every Tag_input pointing at the selected node
+def select_tags_for_selected_node():
+    try:
+        sel_node = nuke.selectedNode()
+    except ValueError:
+        nuke.message("No node selected!")
+        return []
+
+    tags = find_tags_for_node(sel_node)
+    if not tags:
+        nuke.message(f"No tags point at {sel_node.name()}.")
+        return []
+    sel_node.setSelected(False)
+    for tag in tags:
+        tag.setSelected(True)
+    return tags
+
+register_callbacks()
+
 # Create the node when the script runs
 #create_tag_input_node()
@@ -1,38 +1,14 @@
 import nuke
 from PySide2 import QtWidgets, QtGui, QtCore
 from functools import partial
-import colorsys
-import os
-import json
-
-SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".v_backdrop_settings.json")
-
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {"padding": 100, "font_size": 70}  # Reset if corrupted
-    return {"padding": 100, "font_size": 70}  # Default values if settings file does not exist
-
-def save_settings(settings):
-    try:
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(settings, f, indent=4)
-    except IOError as e:
-        nuke.message(f"Error saving settings: {str(e)}")
-
-def get_lowest_z_order(selected_nodes):
-    """Finds the lowest z_order among selected BackdropNodes."""
-    backdrops = [n for n in selected_nodes if n.Class() == "BackdropNode"]
-    if not backdrops:
-        return -700
-    return min([n["z_order"].value() for n in backdrops]) - 1
+import V_instrument
+import V_dialog_manager
+from V_backdrop_ops import (PALETTE, load_settings, save_settings, get_palette, refit_all_backdrops,
+                            create_backdrop_for_nodes, create_auto_backdrops, create_backdrop_layout)
 
 class BackdropCreator(QtWidgets.QDialog):
-    def __init__(self):
-        super(BackdropCreator, self).__init__()
+    def __init__(self, parent=None):
+        super(BackdropCreator, self).__init__(parent)
 
         self.setWindowTitle("Enhanced Backdrop Creator")
         self.setMinimumWidth(400)
@@ -46,113 +22,50 @@ class BackdropCreator(QtWidgets.QDialog):
         self.label_text = None
         self.backdrop_color = None
         self.font_color = 0xFFFFFFFFFF
-        #self.padding = 100
-        self.color_saturation = 0.35  # Saturation value
-        self.color_value = 0.35       # Value (brightness)
-        #self.font_size = 70  # Default font size
-
-        # Preset label-color mappings with adjusted colors
-        self.label_color_presets = self.generate_muted_colors({
-            "Keying": (120, 1),        # Green
-            "Color Correction": (220, 1),  # Blue
-            "Despill": (180, 1),       # Cyan
-            "Roto": (0, 1),            # Red
-            "Plate Fix": (60, 1),      # Yellow
-            "Temp Fix": (45, 1),       # Orange-yellow
-            "Edge Fix": (15, 1),       # Burnt orange
-            "Projection": (270, 1),    # Purple
-            "Temp Grade": (240, 1),  # Soft blue
-            "Cleanup": (150, 1)        # Teal
-        })
-
-        # Preset categories with color-coded options
-        self.preset_categories = {
-            "Compositing": [
-                ("Keying", self.label_color_presets["Keying"]),
-                ("Despill", self.label_color_presets["Despill"]), 
-                ("Temp Fix", self.label_color_presets["Temp Fix"]),
-                ("Edge Fix", self.label_color_presets["Edge Fix"]),
-                ("Projection", self.label_color_presets["Projection"])
-            ],
-            "Color": [
-                ("Color Correction", self.label_color_presets["Color Correction"]), 
-                ("Temp Grade", self.label_color_presets["Temp Grade"])
-            ],
-            "Cleanup": [
-                ("Plate Fix", self.label_color_presets["Plate Fix"]), 
-                ("Roto", self.label_color_presets["Roto"]), 
-                ("Cleanup", self.label_color_presets["Cleanup"])
-            ]
-        }
-
-        # Generate color options
-        self.color_options = self.generate_color_options()
-        
-        self.setup_ui()
 
-    def color_to_hex(self, color_value):
-        """Converts integer color to hex string"""
-        return "#{:06x}".format(color_value >> 8)
+        # Shared with every other dialog, never recomputed per open
+        self._palette_error = None  # Last preset file error shown
+        self.palette = self.load_palette()
+        self.preset_categories = self.palette["presets"]
+        self.color_options = self.palette["colors"]
 
-    def generate_muted_colors(self, base_colors):
-        """
-        Generate muted colors with consistent saturation and value
-        
-        Args:
-            base_colors (dict): Dictionary of color names with (hue, saturation) tuples
-        
-        Returns:
-            dict: Dictionary of color names with muted color values
-        """
-        muted_colors = {}
-        for name, (hue, sat) in base_colors.items():
-            # Modify value for specific colors
-            if name in ["Red", "Green", "Blue", "Yellow"]:
-                value = 0.5  # Higher brightness for these colors
-                saturation = 0.7 # Higher Saturation for these colors
-            else:
-                value = self.color_value  # Default value
-                saturation = self.color_saturation
-            # Convert HSV to RGB, then to Nuke's color format
-            rgb = colorsys.hsv_to_rgb(hue/360, saturation, value)
-            # Convert RGB to Nuke's color format (0-255 scaled to hex with alpha)
-            color_value = (int(rgb[0]*255) << 24) + \
-                          (int(rgb[1]*255) << 16) + \
-                          (int(rgb[2]*255) << 8) + \
-                          0xFF
-            muted_colors[name] = color_value
-        return muted_colors
-
-    def generate_color_options(self):
-        """Generate muted color options with 12 colors"""
-        color_specs = [
-            ("Red", (0, 1)),              # Red
-            ("Green", (120, 0.8)),        # Green
-            ("Yellow", (50, 1)),          # Yellow
-            ("Blue", (220, 1)),           # Blue
-            ("Coral", (16, 1)),           # Coral/Salmon
-            ("Olive", (75, 1)),           # Olive green
-            ("Teal", (180, 1)),           # Teal
-            ("Indigo", (240, 1)),         # Indigo
-            ("Lavender", (270, 1)),       # Lavender
-            ("Magenta", (300, 1)),        # Magenta
-            ("Maroon", (330, 1)),         # Maroon
-            ("Brown", (30, 1))            # Brown
-        ]
-        
-        return {
-            color_name: self.generate_muted_colors({color_name: hue_sat}) 
-            for color_name, hue_sat in color_specs
-        }
-    
-    def get_text_color(self, bg_color):
-        """Returns black or white text color for contrast."""
-        r = (bg_color >> 24) & 0xFF
-        g = (bg_color >> 16) & 0xFF
-        b = (bg_color >> 8) & 0xFF
-        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-        return "black" if luminance > 0.5 else "white"
+        self.setup_ui()
 
+    def load_palette(self):
+        """The palette of the presets_file setting, or the built-in one."""
+        try:
+            palette = get_palette(self.settings.get("presets_file"))
+        except ValueError as e:
+            # Told once, not on every open
+            if str(e) != self._palette_error:
+                self._palette_error = str(e)
+                nuke.message(f"Using the built-in presets, the preset file could not be loaded:\n{e}")
+            return PALETTE
+        self._palette_error = None
+        return palette
+
+    def refresh(self):
+        """Resets the per-use state before the dialog is shown again."""
+        self.label_text = None
+        self.backdrop_color = None
+        self.label_input.clear()
+        # Settings live in memory, so this is a dict copy rather than a disk read
+        self.settings = load_settings()
+        self.padding = self.settings.get("padding", 100)
+        self.font_size = self.settings.get("font_size", 70)
+        palette = self.load_palette()
+        if palette is not self.palette:
+            # Another preset file was chosen, or it was edited since the last open
+            self.palette = palette
+            self.preset_categories = palette["presets"]
+            self.color_options = palette["colors"]
+            self.setup_ui()
+        for spinner, value in ((self.padding_spinner, self.padding), (self.font_size_spinner, self.font_size)):
+            if spinner.value() != value:
+                spinner.blockSignals(True)
+                spinner.setValue(value)
+                spinner.blockSignals(False)
+        self.label_input.setFocus()
 
     def setup_ui(self):
         # Clear existing layout if it exists
@@ -177,16 +90,9 @@ class BackdropCreator(QtWidgets.QDialog):
             group = QtWidgets.QGroupBox(category)
             group_layout = QtWidgets.QVBoxLayout()
 
-            for name, color in names:
+            for name, color, style in names:
                 btn = QtWidgets.QPushButton(name)
-                
-                # Apply color styling
-                text_color = self.get_text_color(color)
-                btn.setStyleSheet(
-                    f"background-color: {self.color_to_hex(color)}; "
-                    f"color: {text_color}; "
-                    "border: 1px solid #555;"
-                )
+                btn.setStyleSheet(style)
                 # Create backdrop immediately on click
                 btn.clicked.connect(partial(self.set_label_and_create, name, color))
                 
@@ -205,17 +111,10 @@ class BackdropCreator(QtWidgets.QDialog):
         col = 0
         max_cols = 4
 
-        for color_name, color_dict in self.color_options.items():
-            # Use the first (and only) color in the dictionary
-            color_value = list(color_dict.values())[0]
-            
+        for color_name, color_value, style in self.color_options:
             color_btn = QtWidgets.QPushButton(color_name)
             color_btn.setFixedSize(80, 30)
-            color_btn.setStyleSheet(
-                f"background-color: {self.color_to_hex(color_value)}; "
-                "color: white; "
-                "border: 1px solid #555;"
-            )
+            color_btn.setStyleSheet(style)
             color_btn.clicked.connect(partial(self.set_color_and_create, color_value))
             color_layout.addWidget(color_btn, row, col)
 
@@ -253,6 +152,21 @@ class BackdropCreator(QtWidgets.QDialog):
         main_layout.addLayout(padding_layout)
         main_layout.addLayout(font_size_layout)  # Add to main layout
 
+        # Wrap every cluster of nodes in the script in its own backdrop
+        auto_btn = QtWidgets.QPushButton("Auto Backdrop Script")
+        auto_btn.clicked.connect(self.auto_backdrop_script)
+        main_layout.addWidget(auto_btn)
+
+        # Shrink or grow every backdrop around what it currently holds
+        refit_btn = QtWidgets.QPushButton("Refit All Backdrops")
+        refit_btn.clicked.connect(self.refit_backdrops)
+        main_layout.addWidget(refit_btn)
+
+        # Lay out the full set of backdrops of a preset file, e.g. for a template script
+        layout_btn = QtWidgets.QPushButton("Create Layout From File...")
+        layout_btn.clicked.connect(self.create_layout_from_file)
+        main_layout.addWidget(layout_btn)
+
         self.setLayout(main_layout)
         
         # Set focus on label input
@@ -292,6 +206,7 @@ class BackdropCreator(QtWidgets.QDialog):
 
     
 
+    @V_instrument.instrumented("V_backdrop_inator.create_backdrop")
     def create_backdrop(self):
         """Creates a backdrop around selected nodes"""
         try:
@@ -301,32 +216,12 @@ class BackdropCreator(QtWidgets.QDialog):
                 nuke.message("No nodes selected!")
                 return
 
-            min_x = min(n.xpos() for n in selected_nodes) - self.padding
-            min_y = min(n.ypos() for n in selected_nodes) - self.padding
-            max_x = max(n.xpos() + n.screenWidth() for n in selected_nodes) + self.padding
-            max_y = max(n.ypos() + n.screenHeight() for n in selected_nodes) + self.padding
-
-            backdrop = nuke.createNode("BackdropNode")
-            backdrop["xpos"].setValue(min_x)
-            backdrop["ypos"].setValue(min_y)
-            backdrop["bdwidth"].setValue(max_x - min_x)
-            backdrop["bdheight"].setValue(max_y - min_y)
-
             # Prioritize input text first, then preset label
             label_text = (self.label_input.text().strip() or 
                           self.label_text or 
                           "Backdrop")
-            backdrop["label"].setValue(label_text)
-
-            if self.backdrop_color:
-                backdrop["tile_color"].setValue(self.backdrop_color)
-
-            # Set label text size
-            backdrop["note_font_size"].setValue(self.font_size)
-
-            # Set label text color to white
-            backdrop["note_font_color"].setValue(0xFFFFFFFF)
-            backdrop["z_order"].setValue(get_lowest_z_order(selected_nodes))  # Adjust Z order properly
+            create_backdrop_for_nodes(selected_nodes, label=label_text, color=self.backdrop_color,
+                                      padding=self.padding, font_size=self.font_size)
 
             self.close()  # Close the UI after creating the backdrop
 
@@ -334,15 +229,67 @@ class BackdropCreator(QtWidgets.QDialog):
             nuke.message(f"Error creating backdrop: {str(e)}")
 
 
+    @V_instrument.instrumented("V_backdrop_inator.auto_backdrop_script")
+    def auto_backdrop_script(self):
+        """Creates backdrops for every node cluster using the current presets"""
+        colors = [color_value for _, color_value, _ in self.color_options]
+        label = self.label_input.text().strip() or "Backdrop"
+        try:
+            backdrops = create_auto_backdrops(padding=self.padding, font_size=self.font_size,
+                                              colors=colors, label=label)
+        except Exception as e:
+            nuke.message(f"Error creating backdrops: {str(e)}")
+            return
+        if not backdrops:
+            nuke.message("No unorganised node clusters found!")
+            return
+        self.close()
+
+    @V_instrument.instrumented("V_backdrop_inator.refit_backdrops")
+    def refit_backdrops(self):
+        """Refits every backdrop in the script to its contents"""
+        try:
+            refit_all_backdrops(padding=self.padding)
+        except Exception as e:
+            nuke.message(f"Error refitting backdrops: {str(e)}")
+            return
+        self.close()
+
+    @V_instrument.instrumented("V_backdrop_inator.create_layout_from_file")
+    def create_layout_from_file(self):
+        """Creates the backdrops of a preset file's layout, and uses its presets from now on"""
+        path = nuke.getFilename("Backdrop preset file", "*.json", default=self.settings.get("presets_file") or None)
+        if not path:
+            return
+        try:
+            create_backdrop_layout(path, font_size=self.font_size)
+        except ValueError as e:
+            nuke.message(f"Error reading preset file: {str(e)}")
+            return
+        except Exception as e:
+            nuke.message(f"Error creating backdrops: {str(e)}")
+            return
+        self.settings["presets_file"] = path
+        save_settings(self.settings)
+        self.close()
+
     def set_color_and_create(self, color_value):
         """Sets the backdrop tile color and creates backdrop"""
         self.backdrop_color = color_value
         self.create_backdrop()
 
 
+def get_backdrop_creator():
+    """Returns the session's BackdropCreator, refreshed for a new use."""
+    # Built on first launch and reused, closing only hides it
+    dialog = V_dialog_manager.get_dialog("backdrop_creator", BackdropCreator)
+    dialog.refresh()
+    return dialog
+
+@V_instrument.instrumented()
 def launch_backdrop_creator():
     if nuke.GUI:
-        dialog = BackdropCreator()
+        dialog = get_backdrop_creator()
         dialog.exec_()
 
 
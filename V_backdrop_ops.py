@@ -0,0 +1,687 @@
+"""Backdrop operations shared by the Backdrop Creator dialog and batch runs.
+
+Fitting, nesting and clustering backdrops, the preset palette and preset file
+layouts. Nothing here imports Qt, so headless `nuke -t` runs can use it.
+"""
+import nuke
+from functools import reduce
+import colorsys
+import json
+import os
+import V_settings
+from V_batch_edit import BatchEdit, set_knob
+from V_geometry import (NodeRects, SpatialGrid, DisjointSet, pad_rect, union_rect,
+                        rects_overlap, rect_contains, rect_center)
+
+SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".v_backdrop_settings.json")
+# presets_file: preset/layout file whose presets replace the built-in buttons
+DEFAULT_SETTINGS = {"padding": 100, "font_size": 70, "presets_file": ""}
+
+# z_order of an outermost backdrop, each level of nesting sits one above its parent
+Z_ORDER_BASE = -700
+
+# Nodes closer than this (in DAG units) share an auto backdrop
+AUTO_BACKDROP_GAP = 80
+# Nodes wired together may sit this far apart and still share one
+AUTO_BACKDROP_LINK_GAP = 250
+# Clusters with fewer nodes than this get no backdrop
+AUTO_BACKDROP_MIN_NODES = 2
+
+def _report_settings_error(error):
+    # Writes happen on a timer thread, so show the message from the main thread
+    nuke.executeInMainThread(nuke.message, args=(f"Error saving settings: {str(error)}",))
+
+def _settings_store():
+    return V_settings.get_store("backdrop", DEFAULT_SETTINGS, SETTINGS_FILE, _report_settings_error)
+
+def load_settings():
+    # Cached in memory, merged over site and show defaults
+    return _settings_store().as_dict()
+
+def save_settings(settings):
+    # Debounced, atomic write in the background
+    _settings_store().update(settings)
+
+def backdrop_rect(backdrop):
+    """Returns the DAG rectangle covered by a BackdropNode."""
+    x, y = backdrop["xpos"].value(), backdrop["ypos"].value()
+    return (x, y, x + backdrop["bdwidth"].value(), y + backdrop["bdheight"].value())
+
+class BackdropIndex(object):
+    """
+    Spatial index over the bounds of every BackdropNode.
+
+    Containment queries go through a SpatialGrid, so nesting depth and the
+    backdrops inside or around a rectangle are found without scanning them all.
+    """
+
+    def __init__(self, backdrops=None):
+        if backdrops is None:
+            backdrops = nuke.allNodes("BackdropNode")
+        self.backdrops = {}
+        self.grid = SpatialGrid(cell_size=500)
+        for backdrop in backdrops:
+            self.add(backdrop)
+
+    def add(self, backdrop):
+        name = backdrop.fullName()
+        self.backdrops[name] = backdrop
+        self.grid.insert(name, backdrop_rect(backdrop))
+
+    def rect(self, name):
+        return self.grid.rects[name]
+
+    def containing(self, rect, exclude=None):
+        """Names of the backdrops that fully contain rect."""
+        return [name for name in self.grid.query(rect)
+                if name != exclude and rect_contains(self.grid.rects[name], rect)
+                and self.grid.rects[name] != rect]
+
+    def contained_in(self, rect, exclude=None):
+        """Names of the backdrops lying fully inside rect."""
+        return [name for name in self.grid.query(rect)
+                if name != exclude and rect_contains(rect, self.grid.rects[name])
+                and self.grid.rects[name] != rect]
+
+    def depth(self, name):
+        """Number of backdrops a backdrop is nested in."""
+        return len(self.containing(self.rect(name), exclude=name))
+
+    def family(self, name):
+        """A backdrop plus every backdrop around it or inside it."""
+        rect = self.rect(name)
+        return [name] + self.containing(rect, exclude=name) + self.contained_in(rect, exclude=name)
+
+    def assign_z_orders(self, names=None):
+        """Sets z_order from nesting depth so parents are always drawn behind children."""
+        for name in (self.backdrops if names is None else names):
+            z_order = Z_ORDER_BASE + self.depth(name)
+            if self.backdrops[name]["z_order"].value() != z_order:
+                set_knob(self.backdrops[name], "z_order", z_order)
+
+def refit_all_backdrops(padding=100, nodes=None):
+    """
+    Refits every backdrop to the nodes it currently covers, in one undo step.
+
+    Nodes go into a SpatialGrid once and each backdrop takes its contents from a
+    grid query. Backdrops are refit innermost first so parents wrap their refit
+    children. Empty backdrops are left as they are.
+
+    Returns:
+        list: The backdrops whose bounds changed
+    """
+    if nodes is None:
+        nodes = nuke.allNodes()
+    index = BackdropIndex([n for n in nodes if n.Class() == "BackdropNode"])
+    rects = NodeRects([n for n in nodes if n.Class() != "BackdropNode"])
+    node_grid = SpatialGrid(cell_size=200)
+    for i in range(len(rects)):
+        node_grid.insert(i, rects.rect(i))
+
+    fitted = {}
+    changed = []
+    with BatchEdit("Refit backdrops") as batch:
+        for name in sorted(index.backdrops, key=index.depth, reverse=True):
+            rect = index.rect(name)
+            contents = [node_grid.rects[i] for i in node_grid.query(rect)]
+            contents += [fitted.get(child, index.rect(child))
+                         for child in index.contained_in(rect, exclude=name)]
+            if not contents:
+                continue
+            new_rect = pad_rect(reduce(union_rect, contents), padding)
+            fitted[name] = new_rect
+            if new_rect != rect:
+                backdrop = index.backdrops[name]
+                batch.set_many(backdrop, {
+                    "xpos": new_rect[0], "ypos": new_rect[1],
+                    "bdwidth": new_rect[2] - new_rect[0], "bdheight": new_rect[3] - new_rect[1],
+                })
+                changed.append(backdrop)
+        # Refitting can change what sits inside what, so apply the new bounds
+        # before indexing them again
+        batch.flush()
+        BackdropIndex(index.backdrops.values()).assign_z_orders()
+        batch.update_ui()
+    return changed
+
+def create_backdrop_for_nodes(nodes, label="Backdrop", color=None, padding=100, font_size=70):
+    """
+    Creates a backdrop around nodes, in one undo step.
+
+    The backdrop gets a z_order from its nesting depth, and so do the backdrops
+    around and inside it.
+
+    Args:
+        nodes (list): Nodes to wrap
+        label (str): Backdrop label
+        color (int): Tile color, None for Nuke's default
+        padding (int): Space between the nodes and the backdrop edge
+        font_size (int): Label font size
+
+    Returns:
+        The new BackdropNode
+    """
+    if not nodes:
+        raise ValueError("No nodes to put a backdrop around")
+
+    # One pass over the nodes, then the bounds come from the arrays
+    min_x, min_y, max_x, max_y = pad_rect(NodeRects(nodes).bbox(), padding)
+    knobs = {
+        "xpos": min_x, "ypos": min_y,
+        "bdwidth": max_x - min_x, "bdheight": max_y - min_y,
+        "label": label,
+        "note_font_size": font_size,
+        "note_font_color": 0xFFFFFFFF,  # White label text
+    }
+    if color:
+        knobs["tile_color"] = color
+
+    with BatchEdit("Create backdrop"):
+        # Knobs given at creation fire no knobChanged, and nuke.nodes skips
+        # createNode's placement and properties panel, so this also runs headless
+        backdrop = nuke.nodes.BackdropNode(**knobs)
+        # Order by nesting depth so parents stay behind the backdrops inside them
+        index = BackdropIndex()
+        index.assign_z_orders(index.family(backdrop.fullName()))
+    return backdrop
+
+def _cluster_indices(rects, indices, gap, link_gap):
+    """Clusters the NodeRects entries at indices, returning lists of those indices."""
+    position = {i: p for p, i in enumerate(indices)}
+    index_by_name = {rects.nodes[i].fullName(): i for i in indices}
+    clusters = DisjointSet(len(indices))
+
+    grid = SpatialGrid(cell_size=max(gap * 2, 100))
+    for p, i in enumerate(indices):
+        rect = rects.rect(i)
+        for q in grid.query(pad_rect(rect, gap)):
+            clusters.union(p, q)
+        grid.insert(p, rect)
+
+    for p, i in enumerate(indices):
+        node = rects.nodes[i]
+        for k in range(node.inputs()):
+            upstream = node.input(k)
+            j = index_by_name.get(upstream.fullName()) if upstream else None
+            if j is not None and rects_overlap(pad_rect(rects.rect(i), link_gap), rects.rect(j)):
+                clusters.union(p, position[j])
+
+    return [[indices[p] for p in group] for group in clusters.groups()]
+
+def cluster_nodes(nodes, gap=AUTO_BACKDROP_GAP, link_gap=AUTO_BACKDROP_LINK_GAP):
+    """
+    Groups nodes by DAG position and connectivity.
+
+    Nodes within gap of each other are grouped, and so are wired nodes within
+    link_gap. Neighbours come from a SpatialGrid, so there are no all-pairs checks.
+
+    Returns:
+        list: One list of nodes per cluster
+    """
+    rects = NodeRects(nodes)
+    groups = _cluster_indices(rects, list(range(len(rects))), gap, link_gap)
+    return [[rects.nodes[i] for i in group] for group in groups]
+
+def _clear_of(rect, core, obstacle):
+    """
+    Shrinks rect so it no longer partly overlaps obstacle, without cutting into core.
+
+    Moves the one edge that keeps the most area. Returns None if every edge
+    would have to cut into core.
+    """
+    candidates = []
+    if core[2] <= obstacle[0] < rect[2]:
+        candidates.append((rect[0], rect[1], obstacle[0], rect[3]))
+    if rect[0] < obstacle[2] <= core[0]:
+        candidates.append((obstacle[2], rect[1], rect[2], rect[3]))
+    if core[3] <= obstacle[1] < rect[3]:
+        candidates.append((rect[0], rect[1], rect[2], obstacle[1]))
+    if rect[1] < obstacle[3] <= core[1]:
+        candidates.append((rect[0], obstacle[3], rect[2], rect[3]))
+    if not candidates:
+        return None
+    return max(candidates, key=lambda r: (r[2] - r[0]) * (r[3] - r[1]))
+
+def plan_cluster_backdrops(rects, clusters, padding, min_nodes=AUTO_BACKDROP_MIN_NODES, existing=()):
+    """
+    Computes padded backdrop rectangles for clusters, merging any that would overlap.
+
+    A plan may enclose an existing backdrop, which then nests inside it. Where a
+    plan only partly overlaps one, its padding on that side is trimmed back to
+    the existing edge. A plan whose nodes themselves reach into an existing
+    backdrop is dropped.
+
+    Args:
+        rects (NodeRects): Rectangles of the clustered nodes
+        clusters (list): Lists of indices into rects
+        existing (list): Rectangles of the backdrops already in the script
+
+    Returns:
+        list: (rect, nodes) pairs, ordered top to bottom then left to right
+    """
+    # (padded rect, bounds of the nodes, nodes)
+    plans = [(pad_rect(rects.bbox(group), padding), rects.bbox(group), [rects.nodes[i] for i in group])
+             for group in clusters if len(group) >= min_nodes]
+
+    # Merging two backdrops can make the result overlap a third, so repeat until stable
+    merged = True
+    while merged and len(plans) > 1:
+        merged = False
+        grid = SpatialGrid(cell_size=500)
+        groups = DisjointSet(len(plans))
+        for i, (rect, _, _) in enumerate(plans):
+            for j in grid.query(rect):
+                merged = groups.union(i, j) or merged
+            grid.insert(i, rect)
+        if merged:
+            plans = [(reduce(union_rect, [plans[i][0] for i in group]),
+                      reduce(union_rect, [plans[i][1] for i in group]),
+                      [n for i in group for n in plans[i][2]])
+                     for group in groups.groups()]
+
+    # Trimming only shrinks plans, so they stay clear of each other
+    obstacles = SpatialGrid(cell_size=500)
+    for k, rect in enumerate(existing):
+        obstacles.insert(k, rect)
+    cleared = []
+    for rect, core, nodes in plans:
+        # A trim can turn an enclosed backdrop into a partly overlapped one, so repeat until stable
+        overlapping = True
+        while rect is not None and overlapping:
+            overlapping = False
+            for k in obstacles.query(rect):
+                obstacle = obstacles.rects[k]
+                if rects_overlap(rect, obstacle) and not rect_contains(rect, obstacle):
+                    rect = _clear_of(rect, core, obstacle)
+                    overlapping = True
+                    break
+        if rect is not None:
+            cleared.append((rect, nodes))
+
+    return sorted(cleared, key=lambda plan: (plan[0][1], plan[0][0]))
+
+def create_auto_backdrops(nodes=None, padding=100, font_size=70, colors=None, label="Backdrop",
+                          gap=AUTO_BACKDROP_GAP, min_nodes=AUTO_BACKDROP_MIN_NODES):
+    """
+    Wraps every cluster of nodes in its own backdrop, in one undo step.
+
+    Nodes already sitting on a backdrop are left alone, and the new backdrops
+    do not partly overlap existing ones (see plan_cluster_backdrops). They get
+    z_orders from their nesting depth, and so do the backdrops they enclose.
+
+    Args:
+        nodes (list): Nodes to organise, defaults to the whole script
+        padding (int): Space between the nodes and the backdrop edge
+        font_size (int): Label font size
+        colors (list): Tile colors used in turn, one per backdrop
+        label (str): Label prefix, numbered per backdrop
+
+    Returns:
+        list: The created BackdropNodes
+    """
+    if nodes is None:
+        nodes = nuke.allNodes()
+
+    existing = SpatialGrid(cell_size=500)
+    for n in nodes:
+        if n.Class() == "BackdropNode":
+            existing.insert(n.fullName(), backdrop_rect(n))
+
+    rects = NodeRects([n for n in nodes if n.Class() != "BackdropNode"])
+    free = []
+    for i in range(len(rects)):
+        x, y = rect_center(rects.rect(i))
+        if not existing.query((x, y, x + 1, y + 1)):
+            free.append(i)
+
+    clusters = _cluster_indices(rects, free, gap, AUTO_BACKDROP_LINK_GAP)
+    plans = plan_cluster_backdrops(rects, clusters, padding, min_nodes, list(existing.rects.values()))
+    if not plans:
+        return []
+
+    backdrops = []
+    with BatchEdit("Auto backdrops") as batch:
+        for i, (rect, _) in enumerate(plans):
+            knobs = {
+                "xpos": rect[0], "ypos": rect[1],
+                "bdwidth": rect[2] - rect[0], "bdheight": rect[3] - rect[1],
+                "label": f"{label} {i + 1}",
+                "note_font_size": font_size,
+                "note_font_color": 0xFFFFFFFF,
+                "z_order": Z_ORDER_BASE,
+            }
+            if colors:
+                knobs["tile_color"] = colors[i % len(colors)]
+            backdrops.append(nuke.nodes.BackdropNode(**knobs))
+        # Order by nesting depth so the backdrops the new ones enclose stay in front
+        index = BackdropIndex()
+        index.assign_z_orders(list(dict.fromkeys(name for backdrop in backdrops
+                                                 for name in index.family(backdrop.fullName()))))
+        batch.update_ui()
+    return backdrops
+
+# Saturation and value shared by the muted backdrop colours
+COLOR_SATURATION = 0.35
+COLOR_VALUE = 0.35
+# These get a brighter, more saturated variant
+_BRIGHT_COLORS = {"Red", "Green", "Blue", "Yellow"}
+
+# Preset label -> (hue, saturation)
+LABEL_HUES = {
+    "Keying": (120, 1),            # Green
+    "Color Correction": (220, 1),  # Blue
+    "Despill": (180, 1),           # Cyan
+    "Roto": (0, 1),                # Red
+    "Plate Fix": (60, 1),          # Yellow
+    "Temp Fix": (45, 1),           # Orange-yellow
+    "Edge Fix": (15, 1),           # Burnt orange
+    "Projection": (270, 1),        # Purple
+    "Temp Grade": (240, 1),        # Soft blue
+    "Cleanup": (150, 1)            # Teal
+}
+
+# Preset buttons shown in the dialog, grouped by category
+PRESET_CATEGORIES = {
+    "Compositing": ["Keying", "Despill", "Temp Fix", "Edge Fix", "Projection"],
+    "Color": ["Color Correction", "Temp Grade"],
+    "Cleanup": ["Plate Fix", "Roto", "Cleanup"]
+}
+
+# Plain colour buttons, (name, (hue, saturation))
+COLOR_SPECS = [
+    ("Red", (0, 1)),              # Red
+    ("Green", (120, 0.8)),        # Green
+    ("Yellow", (50, 1)),          # Yellow
+    ("Blue", (220, 1)),           # Blue
+    ("Coral", (16, 1)),           # Coral/Salmon
+    ("Olive", (75, 1)),           # Olive green
+    ("Teal", (180, 1)),           # Teal
+    ("Indigo", (240, 1)),         # Indigo
+    ("Lavender", (270, 1)),       # Lavender
+    ("Magenta", (300, 1)),        # Magenta
+    ("Maroon", (330, 1)),         # Maroon
+    ("Brown", (30, 1))            # Brown
+]
+
+def color_to_hex(color_value):
+    """Converts integer color to hex string"""
+    return "#{:06x}".format(color_value >> 8)
+
+def get_text_color(bg_color):
+    """Returns black or white text color for contrast."""
+    r = (bg_color >> 24) & 0xFF
+    g = (bg_color >> 16) & 0xFF
+    b = (bg_color >> 8) & 0xFF
+    luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
+    return "black" if luminance > 0.5 else "white"
+
+def generate_muted_colors(base_colors):
+    """
+    Generate muted colors with consistent saturation and value
+
+    Args:
+        base_colors (dict): Dictionary of color names with (hue, saturation) tuples
+
+    Returns:
+        dict: Dictionary of color names with muted color values
+    """
+    muted_colors = {}
+    for name, (hue, sat) in base_colors.items():
+        # Modify value for specific colors
+        if name in _BRIGHT_COLORS:
+            value = 0.5  # Higher brightness for these colors
+            saturation = 0.7 # Higher Saturation for these colors
+        else:
+            value = COLOR_VALUE
+            saturation = COLOR_SATURATION
+        # Convert HSV to RGB, then to Nuke's color format
+        rgb = colorsys.hsv_to_rgb(hue/360, saturation, value)
+        # Convert RGB to Nuke's color format (0-255 scaled to hex with alpha)
+        color_value = (int(rgb[0]*255) << 24) + \
+                      (int(rgb[1]*255) << 16) + \
+                      (int(rgb[2]*255) << 8) + \
+                      0xFF
+        muted_colors[name] = color_value
+    return muted_colors
+
+def _button_style(color, text_color):
+    return (f"background-color: {color_to_hex(color)}; "
+            f"color: {text_color}; "
+            "border: 1px solid #555;")
+
+def build_palette(label_hues=LABEL_HUES, categories=PRESET_CATEGORIES, color_specs=COLOR_SPECS,
+                  fixed_label_colors=None, fixed_plain_colors=None):
+    """
+    Precompute every preset and colour button of the dialog.
+
+    Args:
+        label_hues (dict): Preset label -> (hue, saturation)
+        categories (dict): Category -> preset labels, in button order
+        color_specs (list): Plain colour buttons, (name, (hue, saturation))
+        fixed_label_colors (dict): Preset label -> exact tile color, used
+                                   instead of a muted hue
+        fixed_plain_colors (dict): The same for the plain colour buttons
+
+    Returns:
+        dict: "presets" maps each category to (label, color, stylesheet) tuples,
+              "colors" is a list of (name, color, stylesheet) tuples
+    """
+    label_colors = generate_muted_colors(label_hues)
+    label_colors.update(fixed_label_colors or {})
+    presets = {
+        category: [(name, label_colors[name], _button_style(label_colors[name], get_text_color(label_colors[name])))
+                   for name in names]
+        for category, names in categories.items()
+    }
+    plain_colors = generate_muted_colors(dict(color_specs))
+    plain_colors.update(fixed_plain_colors or {})
+    colors = [(name, plain_colors[name], _button_style(plain_colors[name], "white"))
+              for name, _ in color_specs]
+    return {"presets": presets, "colors": colors}
+
+# The built-in presets, built once per session, every dialog open reuses it
+PALETTE = build_palette()
+
+# Size of a layout backdrop that gives none, in DAG units
+LAYOUT_WIDTH = 600
+LAYOUT_HEIGHT = 400
+# Space between the script's nodes and a layout placed next to them
+LAYOUT_GAP = 200
+
+# Bump when build_palette's output changes, so palettes cached by older versions are rebuilt
+PALETTE_FORMAT = 2
+
+# Palettes of preset files, by file version, for this session
+_palettes = {}
+
+def _parse_color(text, where):
+    """Nuke tile color from "#rrggbb" or an int."""
+    if isinstance(text, int):
+        return text
+    digits = str(text).lstrip("#")
+    if len(digits) != 6:
+        raise ValueError(f"{where}: expected a colour like \"#3f5f7f\", got {text!r}")
+    try:
+        return (int(digits, 16) << 8) | 0xFF
+    except ValueError:
+        raise ValueError(f"{where}: expected a colour like \"#3f5f7f\", got {text!r}")
+
+def _parse_color_specs(specs, where):
+    """
+    Splits {name: spec} into (name, (hue, saturation)) pairs and fixed colours.
+
+    A spec is {"hue": 120, "saturation": 1}, [120, 1], or an exact "#rrggbb".
+    """
+    if not isinstance(specs, dict):
+        raise ValueError(f"{where}: expected an object of name -> colour")
+    hues, fixed = [], {}
+    for name, spec in specs.items():
+        if isinstance(spec, dict) and "color" in spec:
+            spec = spec["color"]
+        if isinstance(spec, (str, int)):
+            fixed[name] = _parse_color(spec, f"{where} {name}")
+            hues.append((name, (0, 1)))
+        elif isinstance(spec, dict) and "hue" in spec:
+            hues.append((name, (spec["hue"], spec.get("saturation", 1))))
+        elif isinstance(spec, list) and len(spec) == 2:
+            hues.append((name, tuple(spec)))
+        else:
+            raise ValueError(f"{where} {name}: expected a hue or a colour, got {spec!r}")
+    return hues, fixed
+
+def load_preset_file(path):
+    """
+    Reads a backdrop preset file, see assets/presets/backdrop_layout_example.json.
+
+    {"presets": {"Keying": {"hue": 120}, "Roto": "#7f2a2a"},
+     "categories": {"Compositing": ["Keying", "Roto"]},
+     "colors": {"Teal": {"hue": 180}},
+     "layout": {"width": 600, "height": 400,
+                "backdrops": [{"label": "Keying", "x": 0, "y": 0}, ...]}}
+
+    Only "presets" is required. Without "categories" every preset goes in one
+    "Presets" category, without "colors" the built-in colour buttons are kept.
+
+    Returns:
+        dict: build_palette arguments ("label_hues", "categories", "color_specs",
+              "fixed_label_colors", "fixed_plain_colors") plus "layout", a list of backdrop dicts with
+              "label", "x", "y", "width", "height", "color" and "font_size"
+
+    Raises:
+        ValueError: If the file cannot be read or is not a valid preset file
+    """
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (IOError, OSError) as e:
+        raise ValueError(f"{path}: {e.strerror}")
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}")
+    if not isinstance(data, dict) or "presets" not in data:
+        raise ValueError(f"{path}: expected a JSON object with \"presets\"")
+
+    label_hues, fixed_label_colors = _parse_color_specs(data["presets"], f"{path}: presets")
+    categories = data.get("categories") or {"Presets": [name for name, _ in label_hues]}
+    for category, names in categories.items():
+        missing = [name for name in names if name not in data["presets"]]
+        if missing:
+            raise ValueError(f"{path}: category {category} lists unknown presets {', '.join(missing)}")
+    color_specs, fixed_plain_colors = COLOR_SPECS, {}
+    if "colors" in data:
+        color_specs, fixed_plain_colors = _parse_color_specs(data["colors"], f"{path}: colors")
+
+    layout = data.get("layout") or {}
+    backdrops = []
+    for i, entry in enumerate(layout.get("backdrops", [])):
+        if not isinstance(entry, dict) or not entry.get("label"):
+            raise ValueError(f"{path}: layout backdrop {i + 1} has no label")
+        try:
+            backdrops.append({
+                "label": entry["label"],
+                "x": int(entry.get("x", 0)), "y": int(entry.get("y", 0)),
+                "width": int(entry.get("width", layout.get("width", LAYOUT_WIDTH))),
+                "height": int(entry.get("height", layout.get("height", LAYOUT_HEIGHT))),
+                # A preset or colour name, or "#rrggbb". Defaults to the preset of the same label
+                "color": entry.get("color", entry["label"]),
+                "font_size": entry.get("font_size", layout.get("font_size")),
+            })
+        except (TypeError, ValueError):
+            raise ValueError(f"{path}: layout backdrop {entry['label']} has a non-numeric position or size")
+    return {"label_hues": dict(label_hues), "categories": categories, "color_specs": color_specs,
+            "fixed_label_colors": fixed_label_colors, "fixed_plain_colors": fixed_plain_colors,
+            "layout": backdrops}
+
+def _palette_store():
+    return V_settings.get_store("backdrop_palette", on_error=_report_settings_error)
+
+def _palette_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise ValueError(f"{path}: {e.strerror}")
+    # A list, so it compares equal to the copy read back from JSON
+    return [PALETTE_FORMAT, os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+def get_palette(path=None):
+    """
+    Returns the dialog's presets and colours, from a preset file or the built-in ones.
+
+    A preset file's palette is built once per version of the file. It is kept
+    for the session and in ~/.v_backdrop_palette_settings.json, so later
+    sessions skip reading and converting the file until it changes.
+
+    Raises:
+        ValueError: If path cannot be read or is not a valid preset file
+    """
+    if not path:
+        return PALETTE
+    signature = _palette_signature(path)
+    key = tuple(signature)
+    palette = _palettes.get(key)
+    if palette is not None:
+        return palette
+    store = _palette_store()
+    cached = store.get(signature[1])
+    if cached and cached.get("signature") == signature:
+        palette = {
+            "presets": {category: [tuple(entry) for entry in entries]
+                        for category, entries in cached["palette"]["presets"].items()},
+            "colors": [tuple(entry) for entry in cached["palette"]["colors"]],
+        }
+    else:
+        presets = load_preset_file(path)
+        palette = build_palette(presets["label_hues"], presets["categories"], presets["color_specs"],
+                                presets["fixed_label_colors"], presets["fixed_plain_colors"])
+        store.set(signature[1], {"signature": signature, "palette": palette})
+    _palettes[key] = palette
+    return palette
+
+def create_backdrop_layout(path, origin=None, font_size=70):
+    """
+    Creates every backdrop in the layout of a preset file, in one undo step.
+
+    Args:
+        path (str): Preset file with a "layout" section
+        origin (tuple): DAG position the layout's x and y are relative to,
+                        defaults to just right of the script's nodes
+        font_size (int): Label size for backdrops that give none
+
+    Returns:
+        list: The created BackdropNodes, in file order
+
+    Raises:
+        ValueError: If the file is not a valid preset file or has no layout
+    """
+    layout = load_preset_file(path)["layout"]
+    if not layout:
+        raise ValueError(f"{path}: no backdrops in \"layout\"")
+    palette = get_palette(path)
+    # Presets win over plain colours of the same name, a backdrop defaults to its label's preset
+    colors = {name: color for name, color, _ in palette["colors"]}
+    colors.update((name, color) for entries in palette["presets"].values() for name, color, _ in entries)
+
+    if origin is None:
+        bbox = NodeRects(nuke.allNodes()).bbox()
+        origin = (bbox[2] + LAYOUT_GAP, bbox[1]) if bbox else (0, 0)
+
+    backdrops = []
+    with BatchEdit("Create backdrop layout") as batch:
+        for entry in layout:
+            knobs = {
+                "xpos": origin[0] + entry["x"], "ypos": origin[1] + entry["y"],
+                "bdwidth": entry["width"], "bdheight": entry["height"],
+                "label": entry["label"],
+                "note_font_size": entry["font_size"] or font_size,
+                "note_font_color": 0xFFFFFFFF,
+                "z_order": Z_ORDER_BASE,
+            }
+            color = entry["color"]
+            if color in colors:
+                knobs["tile_color"] = colors[color]
+            elif isinstance(color, int) or str(color).startswith("#"):
+                knobs["tile_color"] = _parse_color(color, f"{path}: {entry['label']}")
+            backdrops.append(nuke.nodes.BackdropNode(**knobs))
+        # Backdrops laid out inside others are drawn in front of them
+        BackdropIndex(backdrops).assign_z_orders()
+        batch.update_ui()
+    return backdrops
@@ -0,0 +1,129 @@
+"""Batched, undoable knob edits shared by the V tools.
+
+    with BatchEdit("Create backdrop") as batch:
+        batch.set(backdrop, "bdwidth", 400)
+        batch.set(backdrop, "label", "Keying")
+
+Everything inside the block is one undo step. Knob writes are queued, with
+repeated writes to the same knob collapsed into the last one, and applied in
+one pass when the block ends. Writes that would not change a knob are dropped,
+so they fire no knobChanged callbacks. update_ui() calls made inside the block
+turn into a single nuke.updateUI() at the end.
+
+If the block raises, the undo group is cancelled, which rolls back the nodes
+and knobs it touched. A block without an undo group still applies its queued
+writes before the error propagates, as plain knob writes would have.
+
+Blocks nest: an inner BatchEdit joins the outermost one, so a tool that calls
+another tool still produces one undo step and one redraw.
+"""
+import nuke
+
+# Open batches, outermost first. Edits only ever happen on Nuke's main thread.
+_stack = []
+
+class BatchEdit(object):
+    """
+    Context manager grouping knob writes and redraws into one undo step.
+
+    Args:
+        name (str): Undo step name shown in Edit > Undo, or None to only batch
+                    the writes without opening an undo group (for callbacks,
+                    which already run inside the user's own undo step)
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self._writes = {}
+        self._needs_update = False
+        self._undo = None
+        self._outer = None
+
+    def __enter__(self):
+        if _stack:
+            self._outer = _stack[0]
+        elif self.name:
+            self._undo = nuke.Undo()
+            self._undo.begin(self.name)
+        _stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _stack.pop()
+        if self._outer is not None:
+            return False  # The outermost batch applies everything
+        if exc_type is not None and self._undo is not None:
+            # Roll back everything the block did, not just the queued writes
+            self._writes.clear()
+            self._undo.cancel()
+            return False
+        try:
+            # Without an undo group the nodes already made stay, so give them
+            # the writes they were meant to get rather than leaving them half set
+            self.flush()
+            if self._needs_update:
+                nuke.updateUI()
+        finally:
+            self._writes.clear()
+            if self._undo is not None:
+                self._undo.end()
+        return False
+
+    def _root(self):
+        return self._outer or self
+
+    def set(self, node, knob_name, value):
+        """Queues node[knob_name] = value. A later write to the same knob replaces it."""
+        root = self._root()
+        root._writes.pop((node, knob_name), None)  # Re-queue at the end, keeping write order
+        root._writes[(node, knob_name)] = value
+
+    def set_many(self, node, values):
+        """Queues several writes on one node from a dict of knob name -> value."""
+        for knob_name, value in values.items():
+            self.set(node, knob_name, value)
+
+    def update_ui(self):
+        """Asks for one nuke.updateUI() once the outermost batch ends."""
+        self._root()._needs_update = True
+
+    def flush(self):
+        """
+        Applies the queued writes now.
+
+        Call this before reading back a knob written in the same batch, for
+        example the position of a node the batch has just moved.
+
+        Returns:
+            int: How many knobs actually changed
+        """
+        root = self._root()
+        writes = list(root._writes.items())
+        root._writes.clear()
+        changed = 0
+        for (node, knob_name), value in writes:
+            knob = node[knob_name]
+            if knob.value() != value:
+                knob.setValue(value)
+                changed += 1
+        return changed
+
+def active_batch():
+    """Returns the outermost open BatchEdit, or None."""
+    return _stack[0] if _stack else None
+
+def set_knob(node, knob_name, value):
+    """Writes a knob through the open batch, or straight away when there is none."""
+    batch = active_batch()
+    if batch is not None:
+        batch.set(node, knob_name, value)
+    else:
+        node[knob_name].setValue(value)
+
+def update_ui():
+    """Redraws now, or once at the end of the open batch."""
+    batch = active_batch()
+    if batch is not None:
+        batch.update_ui()
+    else:
+        nuke.updateUI()
@@ -0,0 +1,408 @@
+"""Apply one of the V tools to many .nk scripts at once, headless.
+
+    python V_batch_runner.py reconnect_tags /shows/abc/comp
+    python V_batch_runner.py remap_layers --map "diffuse_direct=diff_dir, re:^spec_(.*)=sp_\\1" -j 8 /shows/abc
+    python V_batch_runner.py refit_backdrops --padding 80 --dry-run shot010_comp_v003.nk
+    python V_batch_runner.py --list
+
+Run it with plain Python. It starts --jobs "nuke -t" workers. Each worker
+stays up and takes one script at a time over stdin, so Nuke's start-up and
+license checkout are paid once per worker, not once per script. A script is
+saved only when the operation changed something. A worker that crashes, or
+runs past --timeout on a script, is killed and replaced, and that script is
+reported as failed.
+"""
+import argparse
+import collections
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from fnmatch import fnmatch
+
+NUKE_ENV_VAR = "V_TOOLS_NUKE"
+DEFAULT_NUKE = os.environ.get(NUKE_ENV_VAR) or "nuke"
+
+# Seconds a script may take to open, change and save
+DEFAULT_TIMEOUT = 600
+# Seconds a worker may take to start Nuke and import the tools
+STARTUP_TIMEOUT = 300
+
+# Worker output lines carrying results, everything else is Nuke's own output
+RESULT_PREFIX = "V_BATCH_RESULT "
+READY_LINE = "V_BATCH_READY"
+# Lines of a worker's own output kept to explain a crash
+LOG_TAIL_LINES = 20
+
+def _matching_nodes(nuke, options):
+    """Root-level nodes whose class is in options["classes"] and whose name matches options["nodes"]."""
+    classes = set(c.strip() for c in (options.get("classes") or "").split(",") if c.strip())
+    patterns = [p.strip() for p in (options.get("nodes") or "").split(",") if p.strip()]
+    return [node for node in nuke.allNodes()
+            if (not classes or node.Class() in classes)
+            and (not patterns or any(fnmatch(node.name(), p) for p in patterns))]
+
+def reconnect_tags(nuke, options):
+    """Rewire every Tag_input to the node named in its 'nc' knob."""
+    import Tag_input
+    connected, _ = Tag_input.reconnect_all_tags(show_report=False)
+    return connected
+
+def tag_nodes(nuke, options):
+    """Add a Tag_input below each --classes/--nodes match that has none yet."""
+    import Tag_input
+    registry = Tag_input.TagRegistry()
+    nodes = [n for n in _matching_nodes(nuke, options)
+             if not Tag_input.is_tag_input(n) and not registry.tags_for(n.name())]
+    return len(Tag_input.tag_nodes(nodes))
+
+def remap_layers(nuke, options):
+    """Rename Shuffle layers script-wide from --map rules (old=new, re:pattern=replacement)."""
+    import V_shuffle_ops
+    mapping, rules = V_shuffle_ops.parse_remap_text(options["map"])
+    return len(V_shuffle_ops.remap_shuffle_layers(mapping, rules)["changes"])
+
+def shuffle_layers(nuke, options):
+    """Set --in and --out on the Shuffles matching --nodes."""
+    import V_shuffle_ops
+    shuffles = [n for n in _matching_nodes(nuke, options) if n.Class() in V_shuffle_ops.SHUFFLE_LAYER_KNOBS]
+    for shuffle in shuffles:
+        V_shuffle_ops.apply_shuffle_layers(shuffle, options["in_layer"], options["out_layer"],
+                                           create_out=options.get("create_out", False))
+    return len(shuffles)
+
+def backdrop(nuke, options):
+    """Put one backdrop labelled --label around the --classes/--nodes matches."""
+    import V_backdrop_ops
+    nodes = _matching_nodes(nuke, options)
+    if not nodes:
+        return 0
+    V_backdrop_ops.create_backdrop_for_nodes(nodes, label=options.get("label") or "Backdrop",
+                                             padding=options["padding"], font_size=options["font_size"])
+    return 1
+
+def refit_backdrops(nuke, options):
+    """Refit every backdrop to the nodes it covers."""
+    import V_backdrop_ops
+    return len(V_backdrop_ops.refit_all_backdrops(padding=options["padding"]))
+
+def auto_backdrops(nuke, options):
+    """Wrap every node cluster not yet on a backdrop in its own backdrop."""
+    import V_backdrop_ops
+    colors = [color for _, color, _ in V_backdrop_ops.PALETTE["colors"]]
+    return len(V_backdrop_ops.create_auto_backdrops(padding=options["padding"], font_size=options["font_size"],
+                                                    colors=colors, label=options.get("label") or "Backdrop"))
+
+def prune_layers(nuke, options):
+    """Insert Remove nodes where layers nothing below uses are carried along."""
+    import V_channel_analyzer
+    result = V_channel_analyzer.analyze_channels()
+    return len(V_channel_analyzer.insert_remove_nodes(result["suggestions"]))
+
+def backdrop_layout(nuke, options):
+    """Add the backdrops laid out in the --layout preset file, right of the script's nodes."""
+    import V_backdrop_ops
+    return len(V_backdrop_ops.create_backdrop_layout(options["layout"], font_size=options["font_size"]))
+
+# name -> function(nuke, options) returning how many changes it made
+OPERATIONS = {
+    "reconnect_tags": reconnect_tags,
+    "tag_nodes": tag_nodes,
+    "remap_layers": remap_layers,
+    "shuffle_layers": shuffle_layers,
+    "backdrop": backdrop,
+    "refit_backdrops": refit_backdrops,
+    "auto_backdrops": auto_backdrops,
+    "backdrop_layout": backdrop_layout,
+    "prune_layers": prune_layers,
+}
+
+# Options an operation cannot run without
+REQUIRED_OPTIONS = {
+    "remap_layers": ("map",),
+    "shuffle_layers": ("nodes", "in_layer", "out_layer"),
+    "backdrop": ("label",),
+    "backdrop_layout": ("layout",),
+}
+
+def output_path(script, suffix):
+    """Where a changed script is saved: in place, or next to it with suffix before '.nk'."""
+    if not suffix:
+        return script
+    root, ext = os.path.splitext(script)
+    return f"{root}{suffix}{ext}"
+
+def process_script(nuke, script, operation, options):
+    """
+    Opens script, applies operation and saves it if anything changed. Runs inside a worker.
+
+    Returns:
+        dict: "script", "ok", "changes", "saved", "error" and the seconds spent
+              in "open", "apply" and "save"
+    """
+    result = {"script": script, "ok": False, "changes": 0, "saved": False, "error": None,
+              "open": 0.0, "apply": 0.0, "save": 0.0}
+    try:
+        start = time.perf_counter()
+        # Raises on missing plugins or bad knobs, and such a script is not saved
+        nuke.scriptOpen(script)
+        opened = time.perf_counter()
+        result["open"] = opened - start
+        result["changes"] = OPERATIONS[operation](nuke, options) or 0
+        applied = time.perf_counter()
+        result["apply"] = applied - opened
+        if result["changes"] and not options.get("dry_run"):
+            nuke.scriptSaveAs(output_path(script, options.get("suffix")), overwrite=1)
+            result["saved"] = True
+            result["save"] = time.perf_counter() - applied
+        result["ok"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        try:
+            nuke.scriptClear()  # Also resets the tools' per-script caches
+        except Exception as e:
+            result["ok"] = False
+            result["error"] = result["error"] or f"could not close script: {e}"
+    return result
+
+def worker_main(operation, options):
+    """Loop run by each "nuke -t" worker: one script path in per line, one result line out."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import nuke
+    print(READY_LINE, flush=True)
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            return 0  # The runner closed stdin, all scripts are done
+        script = line.strip()
+        if script:
+            result = process_script(nuke, script, operation, options)
+            print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+def _failure(script, error):
+    return {"script": script, "ok": False, "changes": 0, "saved": False, "error": error,
+            "open": 0.0, "apply": 0.0, "save": 0.0}
+
+class Worker(object):
+    """
+    Drives one "nuke -t" worker process from the runner.
+
+    The process is started on first use and replaced after a crash or a
+    timeout, so one bad script does not take the rest of the batch with it.
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+        self.lines = None
+        self.log = collections.deque(maxlen=LOG_TAIL_LINES)
+
+    def _read(self, process, lines):
+        for line in process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                lines.put(json.loads(line[len(RESULT_PREFIX):]))
+            elif line.strip() == READY_LINE:
+                lines.put(READY_LINE)
+            else:
+                self.log.append(line.rstrip())
+        lines.put(None)  # The process exited
+
+    def _log_tail(self):
+        return " | ".join(line for line in self.log if line.strip()) or "no output"
+
+    def start(self):
+        self.log.clear()
+        self.lines = queue.Queue()
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1)
+        reader = threading.Thread(target=self._read, args=(self.process, self.lines),
+                                  name="V_batch_runner worker output")
+        reader.daemon = True
+        reader.start()
+        try:
+            ready = self.lines.get(timeout=STARTUP_TIMEOUT)
+        except queue.Empty:
+            ready = None
+        if ready != READY_LINE:
+            self.stop()
+            raise RuntimeError(f"worker did not start: {self._log_tail()}")
+
+    def run(self, script, timeout):
+        """Processes one script, returning its result with "seconds" as seen by the runner."""
+        if self.process is None or self.process.poll() is not None:
+            try:
+                self.start()
+            except (OSError, RuntimeError) as e:
+                return _failure(script, str(e))
+        start = time.perf_counter()
+        try:
+            self.process.stdin.write(script + "\n")
+            self.process.stdin.flush()
+            result = self.lines.get(timeout=timeout)
+            if result is None:
+                result = _failure(script, f"worker crashed: {self._log_tail()}")
+                self.stop()
+        except queue.Empty:
+            result = _failure(script, f"timed out after {timeout} s")
+            self.stop()
+        except (OSError, ValueError):
+            result = _failure(script, f"worker crashed: {self._log_tail()}")
+            self.stop()
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    def stop(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def close(self):
+        """Lets the worker finish and exit, killing it if it does not."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        self.stop()
+
+def worker_command(operation, options, nuke_command=DEFAULT_NUKE, nuke_args=()):
+    """Command line that starts one worker."""
+    return ([nuke_command] + list(nuke_args) +
+            ["-t", os.path.abspath(__file__), "--worker", operation, json.dumps(options)])
+
+def run_batch(scripts, operation, options, jobs=4, timeout=DEFAULT_TIMEOUT, nuke_command=DEFAULT_NUKE,
+              nuke_args=(), on_result=None):
+    """
+    Applies operation to every script, spread over jobs worker processes.
+
+    Args:
+        scripts (list): .nk files
+        operation (str): Name from OPERATIONS
+        options (dict): Operation options, plus "dry_run" and "suffix"
+        jobs (int): Worker processes, each holding one Nuke license
+        timeout (float): Seconds allowed per script
+        on_result (callable): Called with each result as it arrives, from the worker threads
+
+    Returns:
+        list: One process_script result per script, in script order
+    """
+    todo = queue.Queue()
+    for i, script in enumerate(scripts):
+        todo.put((i, script))
+    results = [None] * len(scripts)
+    command = worker_command(operation, options, nuke_command, nuke_args)
+    report_lock = threading.Lock()
+
+    def drive():
+        worker = Worker(command)
+        try:
+            while True:
+                try:
+                    i, script = todo.get_nowait()
+                except queue.Empty:
+                    return
+                results[i] = worker.run(script, timeout)
+                if on_result:
+                    with report_lock:
+                        on_result(results[i])
+        finally:
+            worker.close()
+
+    # Workers pull scripts as they finish, so one slow script does not hold up a queue
+    threads = [threading.Thread(target=drive, name=f"V_batch_runner worker {n}")
+               for n in range(min(jobs, len(scripts)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def format_result(result):
+    if not result["ok"]:
+        return f"FAILED {result['seconds']:8.2f}s  {result['script']}: {result['error']}"
+    state = "saved" if result["saved"] else ("changed" if result["changes"] else "ok")
+    return (f"{state:<7}{result['seconds']:8.2f}s  open {result['open']:.2f}s  apply {result['apply']:.2f}s  "
+            f"save {result['save']:.2f}s  {result['changes']:>5} change(s)  {result['script']}")
+
+def format_summary(results, wall_seconds):
+    from V_instrument import percentile
+    seconds = sorted(r["seconds"] for r in results)
+    failed = sum(1 for r in results if not r["ok"])
+    changed = sum(1 for r in results if r["ok"] and r["changes"])
+    line = (f"{len(results)} script(s): {changed} changed, {len(results) - changed - failed} unchanged, "
+            f"{failed} failed in {wall_seconds:.1f}s")
+    if seconds:
+        line += f" (per script p50 {percentile(seconds, 50):.2f}s, max {seconds[-1]:.2f}s)"
+    return line
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--worker"]:
+        return worker_main(argv[1], json.loads(argv[2]))
+
+    parser = argparse.ArgumentParser(description="Apply a V tool to many .nk scripts in headless Nuke workers.")
+    parser.add_argument("operation", nargs="?", choices=sorted(OPERATIONS), help="What to do to each script")
+    parser.add_argument("paths", nargs="*", help=".nk files or folders to search")
+    parser.add_argument("--list", action="store_true", help="Describe the operations and exit")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Worker processes, each takes a Nuke license (default: 4)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds allowed per script")
+    parser.add_argument("--nuke", default=DEFAULT_NUKE, help=f"Nuke executable (default: ${NUKE_ENV_VAR} or nuke)")
+    parser.add_argument("--nuke-args", default="", help="Extra Nuke flags, e.g. \"-i\" for an interactive license")
+    parser.add_argument("--dry-run", action="store_true", help="Apply and report, but save nothing")
+    parser.add_argument("--suffix", default="", help="Save changed scripts next to the original with this suffix, e.g. _fixed")
+    parser.add_argument("--json", dest="json_path", help="Also write the full results to this JSON file")
+    group = parser.add_argument_group("operation options")
+    group.add_argument("--map", help="remap_layers rules: old=new, re:pattern=replacement")
+    group.add_argument("--classes", help="Comma separated node classes to act on, e.g. Read,Camera3")
+    group.add_argument("--nodes", help="Comma separated node name patterns to act on, e.g. Shuffle_beauty*")
+    group.add_argument("--in", dest="in_layer", help="shuffle_layers input layer")
+    group.add_argument("--out", dest="out_layer", help="shuffle_layers output layer")
+    group.add_argument("--create-out", action="store_true", help="shuffle_layers: create --out if it is missing")
+    group.add_argument("--label", help="Backdrop label")
+    group.add_argument("--padding", type=int, default=100, help="Backdrop padding (default: 100)")
+    group.add_argument("--font-size", type=int, default=70, help="Backdrop label size (default: 70)")
+    group.add_argument("--layout", help="backdrop_layout preset file with a \"layout\" section")
+    # Options may come before or after the script paths
+    args = parser.parse_intermixed_args(argv)
+
+    if args.list:
+        for name, func in OPERATIONS.items():
+            print(f"{name:<18}{func.__doc__}")
+        return 0
+    if not args.operation or not args.paths:
+        parser.error("an operation and at least one script or folder are required")
+    options = {key: value for key, value in vars(args).items()
+               if key in ("map", "classes", "nodes", "in_layer", "out_layer", "create_out", "label",
+                          "padding", "font_size", "layout", "dry_run", "suffix")}
+    missing = [name for name in REQUIRED_OPTIONS.get(args.operation, ()) if not options.get(name)]
+    if missing:
+        parser.error(f"{args.operation} needs " + ", ".join(f"--{name.replace('_layer', '')}" for name in missing))
+    if options.get("layout"):
+        # Workers may run in another directory
+        options["layout"] = os.path.abspath(options["layout"])
+
+    from V_nk_audit import find_scripts
+    scripts = find_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    start = time.perf_counter()
+    results = run_batch(scripts, args.operation, options, args.jobs, args.timeout, args.nuke,
+                        args.nuke_args.split(), on_result=lambda result: print(format_result(result), flush=True))
+    print(format_summary(results, time.perf_counter() - start))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(not r["ok"] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
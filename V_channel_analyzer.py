@@ -0,0 +1,367 @@
+"""Find the layers each branch of a script needs, and drop the rest early with Remove nodes.
+
+Multi-layer EXRs bring every layer of the render into the script, and every
+node below a Read carries all of them, even when the branch only uses one
+layer through a Shuffle. This module walks the graph twice.
+
+1. Upward from the outputs: a Write needs the layers of its 'channels' knob,
+   a Shuffle needs its 'in' layers but not the layers it overwrites, and
+   other nodes need what their channel and mask knobs name, on top of what
+   the nodes below them need. Channel knobs are found by type, not name.
+2. Downward from the Reads: the layers that flow along each connection. Where
+   a connection carries at least MIN_DROPPED_CHANNELS channels that nothing
+   below needs, a Remove node is suggested there.
+
+Each pass visits every node and connection once. A chain of nodes that
+changes nothing shares one layer set, so a 5000 node script with hundreds of
+layers takes a fraction of a second. Nodes that could read any channel
+(Groups, gizmos, Expressions) keep everything above them.
+
+    result = V_channel_analyzer.analyze_channels()
+    print(V_channel_analyzer.format_channel_report(result))
+    V_channel_analyzer.insert_remove_nodes(result["suggestions"])
+"""
+from collections import deque
+import nuke
+import V_instrument
+from V_batch_edit import BatchEdit
+from V_shuffle_ops import SHUFFLE_LAYER_KNOBS
+
+# Stands for every channel in a layer set, as in a knob set to "all"
+ALL = "all"
+
+# Knob types whose value names channels, whatever the knob is called: a Grade's
+# channels and mask, ZDefocus2's depth, IDistort's uv, Premult's alpha
+CHANNEL_KNOB_TYPES = tuple(getattr(nuke, name) for name in ("Channel_Knob", "ChannelMask_Knob")
+                           if hasattr(nuke, name))
+
+# Nodes that may read any channel. Gizmos are recognised by their gizmo_file knob
+OPAQUE_CLASSES = {"Group", "LiveGroup", "Expression", "MergeExpression", "BlinkScript", "Precomp"}
+
+# Nodes that are not part of the image graph
+IGNORED_CLASSES = {"BackdropNode", "StickyNote"}
+
+# Nodes that render the layers in their 'channels' knob
+OUTPUT_CLASSES = {"Write", "DeepWrite"}
+
+# What a node nothing is connected to is assumed to be viewed with
+VIEWED_LAYERS = frozenset(["rgba"])
+
+# Smallest saving, in channels, worth a Remove node
+MIN_DROPPED_CHANNELS = 4
+
+# Channel-set knobs of a Remove node
+REMOVE_KNOBS = ("channels", "channels2", "channels3", "channels4")
+
+# Channels assumed for a layer no Read delivers, e.g. one a Shuffle creates
+DEFAULT_LAYER_CHANNELS = 4
+
+# 32-bit float, as Nuke processes every channel
+BYTES_PER_CHANNEL = 4
+
+# Values of channel knobs that name no layer
+_NO_LAYER = {"", "none", "black", "white", "0", "1"}
+
+# Names Nuke accepts for parts of the rgba layer
+_LAYER_ALIASES = {"rgb": "rgba", "alpha": "rgba"}
+
+_NOTHING = frozenset()
+_EVERYTHING = frozenset([ALL])
+
+def layer_of(channel):
+    """'rgba.red' and 'rgb' give 'rgba', 'depth.Z' gives 'depth'."""
+    layer = channel.lstrip("-").split(".")[0]
+    return _LAYER_ALIASES.get(layer, layer)
+
+def knob_layers(value):
+    """Layers named by a channel knob value, e.g. "rgba", "{rgba.red -rgba.alpha}" or "all"."""
+    tokens = str(value).replace("{", " ").replace("}", " ").split()
+    return set(layer_of(token) for token in tokens) - _NO_LAYER
+
+def _merge(layers, more):
+    # Returns layers itself when more adds nothing, so unchanged chains share one set
+    return layers if more <= layers else layers | more
+
+class _Vertex(object):
+    """One node of the analysed graph and how it treats the layers passing through it."""
+    __slots__ = ("node", "name", "kind", "inputs", "dependents", "reads", "writes", "keep")
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+        self.kind = "node"         # node, pass, shuffle, remove or opaque
+        self.inputs = []           # Input vertex names, None for empty inputs
+        self.dependents = []       # (vertex name, input index) of the nodes below
+        self.reads = _NOTHING      # Layers the node needs on top of what passes through
+        self.writes = _NOTHING     # Layers a Shuffle overwrites, or a Remove removes
+        self.keep = None           # Layers a Remove in keep mode lets through
+
+def _read_vertex(node):
+    vertex = _Vertex(node, node.fullName())
+    vertex.inputs = [inp.fullName() if inp is not None else None
+                     for inp in (node.input(i) for i in range(node.inputs()))]
+    node_class = node.Class()
+    disable = node.knob("disable")
+    if disable is not None and disable.value():
+        vertex.kind = "pass"
+    elif node_class in SHUFFLE_LAYER_KNOBS:
+        in_knob, in2_knob, out_knob, out2_knob = SHUFFLE_LAYER_KNOBS[node_class]
+        vertex.kind = "shuffle"
+        vertex.reads = frozenset(_knob_value_layers(node, (in_knob, in2_knob)))
+        vertex.writes = frozenset(_knob_value_layers(node, (out_knob, out2_knob)))
+    elif node_class == "Remove":
+        vertex.kind = "remove"
+        layers = frozenset(_knob_value_layers(node, REMOVE_KNOBS))
+        if node["operation"].value() == "keep":
+            vertex.keep = layers
+        else:
+            vertex.writes = layers
+    elif node_class in OPAQUE_CLASSES or node.knob("gizmo_file") is not None or not CHANNEL_KNOB_TYPES:
+        # Without the knob types nothing tells what a node reads, so it may read anything
+        vertex.kind = "opaque"
+    else:
+        vertex.reads = frozenset(_channel_knob_layers(node))
+    return vertex
+
+def _channel_knob_layers(node):
+    layers = set()
+    for knob in node.knobs().values():
+        if isinstance(knob, CHANNEL_KNOB_TYPES):
+            layers |= knob_layers(knob.value())
+    return layers
+
+def _knob_value_layers(node, knob_names):
+    layers = set()
+    for name in knob_names:
+        knob = node.knob(name)
+        if knob is not None:
+            layers |= knob_layers(knob.value())
+    return layers
+
+def _input_demand(vertex, demand, index):
+    """Layers vertex needs from its input index to deliver demand below it."""
+    if vertex.kind == "opaque":
+        return _EVERYTHING
+    if vertex.kind == "shuffle":
+        if index > 0:
+            return vertex.reads  # Only the main input passes through
+        return _merge(demand - vertex.writes if vertex.writes and ALL not in demand else demand, vertex.reads)
+    if vertex.kind == "remove":
+        if vertex.keep is not None:
+            if ALL in vertex.keep:
+                return demand
+            return vertex.keep if ALL in demand else demand & vertex.keep
+        return demand - vertex.writes if vertex.writes and ALL not in demand else demand
+    if vertex.kind == "pass":
+        return demand
+    return _merge(demand, vertex.reads)
+
+def _flow_through(vertex, layers):
+    """Layers vertex delivers, given the layers arriving at its main input."""
+    if vertex.kind == "shuffle":
+        return _merge(layers, vertex.writes)
+    if vertex.kind == "remove":
+        if vertex.keep is not None:
+            return layers if ALL in vertex.keep else layers & vertex.keep
+        return _NOTHING if ALL in vertex.writes else layers - vertex.writes
+    return layers
+
+def _build_graph(nodes):
+    vertices = {}
+    for node in nodes:
+        if node.Class() not in IGNORED_CLASSES:
+            vertex = _read_vertex(node)
+            vertices[vertex.name] = vertex
+    for vertex in vertices.values():
+        for index, name in enumerate(vertex.inputs):
+            if name in vertices:
+                vertices[name].dependents.append((vertex.name, index))
+            else:
+                vertex.inputs[index] = None  # Outside the analysed nodes
+    return vertices
+
+def _upward_order(vertices):
+    """Vertex names with every node after all the nodes below it."""
+    waiting = {name: len(vertex.dependents) for name, vertex in vertices.items()}
+    ready = deque(name for name, count in waiting.items() if count == 0)
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for input_name in vertices[name].inputs:
+            if input_name is not None:
+                waiting[input_name] -= 1
+                if waiting[input_name] == 0:
+                    ready.append(input_name)
+    return order
+
+def analyze_channels(nodes=None, min_channels=MIN_DROPPED_CHANNELS):
+    """
+    Works out which layers every connection needs and where Remove nodes would save the most.
+
+    Args:
+        nodes (list): Nodes to analyse, defaults to every node at the current
+                      level. Give a whole graph: layers used below the given
+                      nodes are not seen.
+        min_channels (int): Smallest number of unused channels worth a Remove
+
+    Returns:
+        dict: "suggestions", one dict per Remove node with "upstream", "dependent"
+              and "input" (the connection to cut into), "operation" ("keep" or
+              "remove"), "layers" (its channel knobs) and "dropped" (channels it
+              removes). "needed" maps each node name to the frozenset of layers
+              the nodes below need from it. "channels_before" and
+              "channels_after" are the channels all nodes carry per pixel,
+              summed, "widest_before" and "widest_after" the most passed along
+              any one connection.
+    """
+    if nodes is None:
+        nodes = nuke.allNodes()
+    vertices = _build_graph(nodes)
+    order = _upward_order(vertices)
+
+    # Upward pass: what each node must deliver, from the outputs to the Reads
+    demand = {}
+    for name in order:
+        vertex = vertices[name]
+        needed = None
+        for dependent_name, index in vertex.dependents:
+            dependent = vertices[dependent_name]
+            layers = _input_demand(dependent, demand[dependent_name], index)
+            needed = layers if needed is None else _merge(needed, layers)
+        if needed is None:
+            needed = _NOTHING if vertex.node.Class() in OUTPUT_CLASSES else VIEWED_LAYERS
+        demand[name] = needed
+
+    # The Reads and other sources are the only nodes whose channels are scanned
+    source_layers = {}
+    layer_channels = {}
+    for name, vertex in vertices.items():
+        if not any(vertex.inputs):
+            channels = nuke.channels(vertex.node)
+            for channel in channels:
+                layer_channels.setdefault(layer_of(channel), set()).add(channel)
+            source_layers[name] = frozenset(layer_of(channel) for channel in channels)
+    channel_counts = {layer: len(channels) for layer, channels in layer_channels.items()}
+    counted = {}
+
+    def count(layers):
+        total = counted.get(layers)
+        if total is None:
+            total = sum(channel_counts.get(layer, DEFAULT_LAYER_CHANNELS) for layer in layers)
+            counted[layers] = total
+        return total
+
+    # Downward pass: what flows along each connection, before and after pruning
+    available, pruned = {}, {}
+    suggestions = []
+    widest_before = widest_after = 0
+    for name in reversed(order):
+        vertex = vertices[name]
+        before = after = source_layers.get(name, _NOTHING)
+        for index, input_name in enumerate(vertex.inputs):
+            if input_name is None:
+                continue
+            arriving = pruned[input_name]
+            needed = _input_demand(vertex, demand[name], index)
+            # Writes only pull the channels they render, a Remove above them saves nothing
+            if (vertex.kind != "remove" and ALL not in needed and
+                    vertex.node.Class() not in OUTPUT_CLASSES):
+                suggestion = _plan_remove(vertices[input_name], vertex, index, arriving, needed, count, min_channels)
+                if suggestion is not None:
+                    suggestions.append(suggestion)
+                    arriving = arriving & needed
+            widest_before = max(widest_before, count(available[input_name]))
+            widest_after = max(widest_after, count(arriving))
+            before = _merge(before, available[input_name]) if before else available[input_name]
+            after = _merge(after, arriving) if after else arriving
+        available[name] = _flow_through(vertex, before)
+        pruned[name] = _flow_through(vertex, after)
+
+    return {
+        "suggestions": suggestions,
+        "needed": demand,
+        "nodes": len(vertices),
+        "channels_before": sum(count(layers) for layers in available.values()),
+        "channels_after": sum(count(layers) for layers in pruned.values()),
+        "widest_before": widest_before,
+        "widest_after": widest_after,
+    }
+
+def _plan_remove(upstream, dependent, index, arriving, needed, count, min_channels):
+    unused = arriving - needed
+    dropped = count(unused) if unused else 0
+    if dropped < min_channels:
+        return None
+    kept = arriving & needed
+    # A Remove takes at most four layers, either the ones to keep or the ones
+    # to drop. Wider sets are left for a connection further down to prune.
+    if not kept:
+        operation, layers = "remove", [ALL]
+    elif len(kept) <= len(REMOVE_KNOBS):
+        operation, layers = "keep", sorted(kept)
+    elif len(unused) <= len(REMOVE_KNOBS):
+        operation, layers = "remove", sorted(unused)
+    else:
+        return None
+    return {"upstream": upstream.node, "dependent": dependent.node, "input": index,
+            "operation": operation, "layers": layers, "dropped": dropped}
+
+def insert_remove_nodes(suggestions):
+    """
+    Inserts the Remove nodes suggested by analyze_channels, in one undo step.
+
+    Returns:
+        list: The new Remove nodes
+    """
+    removes = []
+    with BatchEdit("Prune unused layers") as batch:
+        for suggestion in suggestions:
+            upstream, dependent = suggestion["upstream"], suggestion["dependent"]
+            knobs = {
+                "inputs": [upstream],
+                "operation": suggestion["operation"],
+                "label": f"-{suggestion['dropped']} channels",
+                # Halfway down the connection it cuts into
+                "xpos": upstream.xpos(),
+                "ypos": (upstream.ypos() + dependent.ypos()) // 2,
+            }
+            knobs.update(zip(REMOVE_KNOBS, suggestion["layers"]))
+            remove = nuke.nodes.Remove(**knobs)
+            dependent.setInput(suggestion["input"], remove)
+            removes.append(remove)
+        batch.update_ui()
+    return removes
+
+def format_channel_report(result, limit=30):
+    """Turn the result of analyze_channels into readable text."""
+    before, after = result["channels_before"], result["channels_after"]
+    saved = before - after
+    percent = 100.0 * saved / before if before else 0.0
+    lines = [
+        f"{result['nodes']} nodes carry {before:,} channels per pixel in total, "
+        f"{after:,} after pruning ({percent:.0f}% less).",
+        f"Widest connection: {result['widest_before']} -> {result['widest_after']} channels, "
+        f"{result['widest_before'] * BYTES_PER_CHANNEL} -> {result['widest_after'] * BYTES_PER_CHANNEL} bytes per pixel.",
+    ]
+    suggestions = result["suggestions"]
+    if suggestions:
+        lines.append(f"{len(suggestions)} Remove node(s):")
+    for suggestion in suggestions[:limit]:
+        lines.append(f"  {suggestion['upstream'].fullName()} -> {suggestion['dependent'].fullName()}: "
+                     f"{suggestion['operation']} {', '.join(suggestion['layers'])} "
+                     f"(-{suggestion['dropped']} channels)")
+    if len(suggestions) > limit:
+        lines.append(f"  ... and {len(suggestions) - limit} more")
+    return "\n".join(lines)
+
+@V_instrument.instrumented()
+def prune_unused_layers_ui():
+    """Analyse the script, show the report and insert the Remove nodes on confirmation."""
+    result = analyze_channels()
+    report = format_channel_report(result)
+    if not result["suggestions"]:
+        nuke.message(report + "\n\nNo connection carries enough unused channels to prune.")
+        return
+    if nuke.ask(report + "\n\nInsert these Remove nodes?"):
+        insert_remove_nodes(result["suggestions"])
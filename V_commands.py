@@ -0,0 +1,85 @@
+"""Menu entries and hotkeys for the V tools, registered without importing them.
+
+Each command is stored as a short script that imports its tool module the
+first time it runs, so starting Nuke costs one small import instead of every
+tool plus PySide2. Headless sessions (nuke -t, render nodes) get no menus and
+import nothing else.
+"""
+import importlib
+import nuke
+
+MENU_NAME = "V_commands"
+
+# Imported when the menu is installed because their callbacks have to see
+# every node change from the start (Tag_input keeps tag labels and renamed
+# targets in sync). They do not import Qt.
+CALLBACK_MODULES = ["Tag_input"]
+
+# (menu label, module, function, keyword arguments, hotkey)
+COMMANDS = [
+    ("Shuffle Shift", "Shuffle_shift", "select_channel_for_shuffle", {}, "Alt+`"),
+    ("Tag Input Node", "Tag_input", "create_tag_input_node", {}, "Alt+T"),
+    ("Tag Selected Nodes", "Tag_input", "create_tag_input_node", {"all_selected": True}, "Alt+Shift+T"),
+    ("Reconnect All Tags", "Tag_input", "reconnect_all_tags", {}, None),
+    ("Select Tags Of Node", "Tag_input", "select_tags_for_selected_node", {}, None),
+    ("Create Backdrop", "V_backdrop_inator", "launch_backdrop_creator", {}, "Ctrl+Alt+B"),
+    ("Shuffle Dropdown", "V_shuffle_dropdown", "create_shuffle_ui", {}, "Ctrl+Shift+S"),
+    ("Shuffle Panel", "V_shuffle_panel", "show_panel", {}, None),
+    ("Split All AOVs", "V_shuffle_dropdown", "split_all_layers_ui", {}, None),
+    ("Remap Shuffle Layers", "V_shuffle_dropdown", "remap_shuffle_layers_ui", {}, None),
+    ("Prune Unused Layers", "V_channel_analyzer", "prune_unused_layers_ui", {}, None),
+]
+
+# Dockable panels, (Pane menu label, widget class expression, panel id). Nuke
+# evaluates the expression when the panel is first shown, so registering them
+# imports nothing.
+PANELS = [
+    ("Shuffle Panel", "__import__('V_shuffle_panel').ShufflePanel", "V_tools.ShufflePanel"),
+]
+
+# Pane new panels are docked into
+PANEL_PANE = "Properties.1"
+
+def run(module_name, func_name, **kwargs):
+    """Imports module_name (only slow the first time) and calls func_name with kwargs."""
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)(**kwargs)
+
+def command_script(module_name, func_name, kwargs=None):
+    """Returns the menu script that runs func_name through the registry."""
+    args = "".join(f", {key}={value!r}" for key, value in (kwargs or {}).items())
+    return f"import {__name__}; {__name__}.run({module_name!r}, {func_name!r}{args})"
+
+def add_commands(menu, commands=None):
+    """Adds every command to menu, without importing any tool module."""
+    for label, module_name, func_name, kwargs, hotkey in commands or COMMANDS:
+        menu.addCommand(label, command_script(module_name, func_name, kwargs), hotkey or "")
+
+def register_panels(panels=None):
+    """Adds the dockable panels to the Pane menu, so they can be opened and restored with layouts."""
+    import nukescripts
+    for label, widget, panel_id in panels or PANELS:
+        nukescripts.panels.registerWidgetAsPanel(widget, label, panel_id)
+
+def show_panel(panel_id, pane_name=PANEL_PANE):
+    """Opens a new instance of a registered panel, docked next to pane_name."""
+    import nukescripts
+    label, widget, _ = next(p for p in PANELS if p[2] == panel_id)
+    panel = nukescripts.panels.registerWidgetAsPanel(widget, label, panel_id, create=True)
+    return panel.addToPane(nuke.getPaneFor(pane_name))
+
+def install(menu_name=MENU_NAME):
+    """
+    Builds the tools menu, call this from menu.py.
+
+    Returns:
+        The nuke.Menu that was filled, or None in a headless session
+    """
+    if not nuke.GUI:
+        return None
+    for module_name in CALLBACK_MODULES:
+        importlib.import_module(module_name)
+    menu = nuke.menu("Nuke").addMenu(menu_name)
+    add_commands(menu)
+    register_panels()
+    return menu
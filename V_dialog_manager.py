@@ -0,0 +1,74 @@
+"""Lifecycle of the V tools' Qt dialogs.
+
+Dialogs are parented to Nuke's main window, so they stay on top of it and are
+destroyed with it instead of living on as stray top-level windows. Each tool
+keeps one instance under a key. It is built on first use and then reused:
+the tool points it at the new node, or refreshes its settings, before showing it.
+
+    dialog = V_dialog_manager.get_dialog("shuffle_shift", ChannelButtonPanel)
+    dialog.set_node(node)
+    dialog.exec_()
+
+release() and release_all() close instances and hand them to Qt's
+deleteLater, so the widgets are freed on the next pass of the event loop.
+"""
+from PySide2 import QtWidgets
+try:
+    import shiboken2
+except ImportError:
+    from PySide2 import shiboken2  # Some PySide2 builds only ship it inside the package
+
+# key -> dialog instance
+_dialogs = {}
+_main_window = None
+
+def _alive(widget):
+    """False once Qt has deleted the C++ side of widget, for example with its parent."""
+    return widget is not None and shiboken2.isValid(widget)
+
+def main_window():
+    """Returns Nuke's main window, or None outside the GUI."""
+    global _main_window
+    if _alive(_main_window):
+        return _main_window
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        return None
+    windows = [w for w in app.topLevelWidgets() if w.inherits("QMainWindow")]
+    # Nuke's own class name, for when a floating panel is also a main window
+    docked = [w for w in windows if w.metaObject().className() == "Foundry::UI::DockMainWindow"]
+    _main_window = (docked or windows or [None])[0]
+    return _main_window
+
+def get_dialog(key, factory):
+    """
+    Returns the dialog kept under key, building it on first use.
+
+    Args:
+        key (str): One name per tool dialog
+        factory: Dialog class, or any callable taking parent=, called with the main window
+
+    A dialog is built again if Qt has deleted it, or if factory is a class it
+    is not an instance of (the tool module was reloaded).
+    """
+    dialog = _dialogs.get(key)
+    if dialog is not None and (not _alive(dialog) or
+                               (isinstance(factory, type) and type(dialog) is not factory)):
+        release(key)
+        dialog = None
+    if dialog is None:
+        dialog = factory(parent=main_window())
+        _dialogs[key] = dialog
+    return dialog
+
+def release(key):
+    """Closes the dialog kept under key and has Qt delete it."""
+    dialog = _dialogs.pop(key, None)
+    if _alive(dialog):
+        dialog.close()
+        dialog.deleteLater()
+
+def release_all():
+    """Releases every kept dialog, e.g. before reloading the tools."""
+    for key in list(_dialogs):
+        release(key)
@@ -0,0 +1,153 @@
+"""DAG geometry helpers shared by the layout tools.
+
+Rectangles are (x0, y0, x1, y1) tuples in DAG coordinates, y growing downwards.
+"""
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # Pure Python fallback below
+
+def node_rect(node):
+    """Returns the DAG rectangle a node occupies."""
+    x, y = node.xpos(), node.ypos()
+    return (x, y, x + node.screenWidth(), y + node.screenHeight())
+
+def pad_rect(rect, padding):
+    return (rect[0] - padding, rect[1] - padding, rect[2] + padding, rect[3] + padding)
+
+def union_rect(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def rects_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def rect_contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+def rect_center(rect):
+    return ((rect[0] + rect[2]) / 2.0, (rect[1] + rect[3]) / 2.0)
+
+class NodeRects(object):
+    """
+    Node rectangles collected once into compact arrays.
+
+    Each node is asked for xpos/ypos/screenWidth/screenHeight exactly once; the
+    bounding box, union and overlap queries then run on the arrays, vectorised
+    with NumPy when it is installed and through C-level builtins otherwise.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        x0, y0, x1, y1 = array('d'), array('d'), array('d'), array('d')
+        for node in self.nodes:
+            x, y = node.xpos(), node.ypos()
+            x0.append(x)
+            y0.append(y)
+            x1.append(x + node.screenWidth())
+            y1.append(y + node.screenHeight())
+        if numpy is not None:
+            x0, y0, x1, y1 = (numpy.frombuffer(a, dtype=numpy.float64) for a in (x0, y0, x1, y1))
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def rect(self, i):
+        return (int(self.x0[i]), int(self.y0[i]), int(self.x1[i]), int(self.y1[i]))
+
+    def bbox(self, indices=None):
+        """Union of the rectangles at indices (all by default), or None if there are none."""
+        if indices is None:
+            if not self.nodes:
+                return None
+            x0, y0, x1, y1 = self.x0, self.y0, self.x1, self.y1
+        else:
+            indices = list(indices)
+            if not indices:
+                return None
+            if numpy is not None:
+                x0, y0, x1, y1 = self.x0[indices], self.y0[indices], self.x1[indices], self.y1[indices]
+            else:
+                x0, y0, x1, y1 = ([a[i] for i in indices] for a in (self.x0, self.y0, self.x1, self.y1))
+        if numpy is not None:
+            return (int(x0.min()), int(y0.min()), int(x1.max()), int(y1.max()))
+        return (int(min(x0)), int(min(y0)), int(max(x1)), int(max(y1)))
+
+    def overlapping(self, rect):
+        """Indices of the rectangles overlapping rect."""
+        if numpy is not None:
+            mask = (self.x0 < rect[2]) & (self.x1 > rect[0]) & (self.y0 < rect[3]) & (self.y1 > rect[1])
+            return numpy.nonzero(mask)[0].tolist()
+        return [i for i, (x0, y0, x1, y1) in enumerate(zip(self.x0, self.y0, self.x1, self.y1))
+                if x0 < rect[2] and x1 > rect[0] and y0 < rect[3] and y1 > rect[1]]
+
+class SpatialGrid(object):
+    """
+    Uniform grid over rectangles for neighbourhood and overlap queries.
+
+    Each rectangle is bucketed into the cells it covers, so a query only looks
+    at the items sharing a cell with it instead of checking every pair.
+    """
+
+    def __init__(self, cell_size=200):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rects = {}
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return (int(rect[0] // size), int(rect[1] // size),
+                int(rect[2] // size), int(rect[3] // size))
+
+    def insert(self, key, rect):
+        self.rects[key] = rect
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells.setdefault((cx, cy), []).append(key)
+
+    def remove(self, key):
+        rect = self.rects.pop(key)
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.cells[(cx, cy)].remove(key)
+
+    def query(self, rect):
+        """Returns the keys whose rectangles overlap rect."""
+        found = set()
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for key in self.cells.get((cx, cy), ()):
+                    if key not in found and rects_overlap(self.rects[key], rect):
+                        found.add(key)
+        return found
+
+class DisjointSet(object):
+    """Union-find over the integers 0..size-1, used to grow clusters."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+            return True
+        return False
+
+    def groups(self):
+        groups = {}
+        for i in range(len(self.parent)):
+            groups.setdefault(self.find(i), []).append(i)
+        return list(groups.values())
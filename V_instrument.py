@@ -0,0 +1,198 @@
+"""Opt-in latency logging for the V tools' entry points.
+
+Set V_TOOLS_INSTRUMENT=1 before Nuke starts to record, for every call of an
+instrumented tool, its wall time, how many nuke API calls it made and how many
+nodes the script had. Records are JSON lines in a rotating log
+(V_TOOLS_INSTRUMENT_LOG, default ~/.v_tools_timing.log). Summarise them with:
+
+    python V_instrument.py [log file]
+
+When the variable is not set, instrumented() hands back the function itself,
+so the tools run exactly as they would without this module.
+"""
+import functools
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+ENV_VAR = "V_TOOLS_INSTRUMENT"
+LOG_ENV_VAR = "V_TOOLS_INSTRUMENT_LOG"
+DEFAULT_LOG_FILE = os.path.join(os.path.expanduser("~"), ".v_tools_timing.log")
+
+# Rotate at 1 MB and keep five old files, a few tens of thousands of records
+MAX_LOG_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+
+# Module-level nuke functions whose calls are counted. Node methods live on
+# Nuke's C++ types and cannot be wrapped, so they are not part of the count.
+COUNTED_API = (
+    "allNodes", "toNode", "exists", "selectedNode", "selectedNodes", "createNode",
+    "delete", "channels", "layers", "Layer", "updateUI", "getInput", "ask", "zoom",
+)
+
+PERCENTILES = (50, 90, 99)
+
+ENABLED = os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+_state = threading.local()
+_api_calls = [0]
+_logger = None
+# Failures to write a record, reported once per tool. Not propagated, so they
+# stay out of the timing log, and Python's last-resort handler shows them
+_error_logger = logging.getLogger("V_instrument.errors")
+_error_logger.propagate = False
+_failed_tools = set()
+
+def _counting(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        _api_calls[0] += 1
+        return func(*args, **kwargs)
+    wrapper._v_counted = True
+    return wrapper
+
+def _install_api_counters(nuke_module):
+    for name in COUNTED_API:
+        func = getattr(nuke_module, name, None)
+        if func is not None and not getattr(func, "_v_counted", False):
+            setattr(nuke_module, name, _counting(func))
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger("V_instrument")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = RotatingFileHandler(os.environ.get(LOG_ENV_VAR) or DEFAULT_LOG_FILE,
+                                      maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+def _script_size(nuke_module):
+    calls = _api_calls[0]
+    try:
+        return len(nuke_module.allNodes(recurseGroups=True))
+    except Exception:
+        return None
+    finally:
+        _api_calls[0] = calls  # Measuring the script is not the tool's cost
+
+def instrumented(name=None):
+    """
+    Decorator recording each call of a tool entry point when instrumentation is on.
+
+    Calls made inside another instrumented call are recorded too, with the
+    outer tool as "parent". A modal launcher's time includes the time the
+    dialog was open, so the dialog's actions are instrumented on their own.
+
+    Args:
+        name (str): Tool name in the log, defaults to module.function
+    """
+    def decorate(func):
+        if not ENABLED:
+            return func
+        import nuke
+        _install_api_counters(nuke)
+        tool = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = _state.__dict__.setdefault("stack", [])
+            parent = stack[-1] if stack else None
+            stack.append(tool)
+            calls = _api_calls[0]
+            ok = False
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                api_calls = _api_calls[0] - calls
+                stack.pop()
+                try:
+                    _get_logger().info(json.dumps({
+                        "tool": tool, "seconds": round(seconds, 6), "nuke_calls": api_calls,
+                        "nodes": _script_size(nuke), "ok": ok, "parent": parent,
+                        "time": round(time.time(), 3),
+                    }))
+                except Exception as e:
+                    if tool not in _failed_tools:
+                        _failed_tools.add(tool)
+                        _error_logger.warning("Could not log %s: %s", tool, e)
+        return wrapper
+    return decorate
+
+def read_records(path=None):
+    """Yields the records of path and its rotated backups, oldest file first."""
+    path = path or os.environ.get(LOG_ENV_VAR) or DEFAULT_LOG_FILE
+    files = [f"{path}.{i}" for i in range(LOG_BACKUPS, 0, -1)] + [path]
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(math.ceil(pct / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+def summarize(records):
+    """
+    Groups records per tool.
+
+    Returns:
+        dict: tool -> {"count", "failed", "p50"/"p90"/"p99"/"max" in seconds,
+              "mean_calls", "max_nodes"}
+    """
+    by_tool = {}
+    for record in records:
+        by_tool.setdefault(record.get("tool", "?"), []).append(record)
+    summary = {}
+    for tool, tool_records in sorted(by_tool.items()):
+        seconds = sorted(r.get("seconds", 0.0) for r in tool_records)
+        stats = {"count": len(tool_records), "failed": sum(1 for r in tool_records if not r.get("ok", True))}
+        for pct in PERCENTILES:
+            stats[f"p{pct}"] = percentile(seconds, pct)
+        stats["max"] = seconds[-1]
+        stats["mean_calls"] = sum(r.get("nuke_calls", 0) for r in tool_records) / float(len(tool_records))
+        stats["max_nodes"] = max(r.get("nodes") or 0 for r in tool_records)
+        summary[tool] = stats
+    return summary
+
+def format_summary(summary):
+    header = f"{'tool':<48}{'count':>7}{'failed':>8}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    lines = [header + f"{'max ms':>10}{'calls':>8}{'nodes':>8}"]
+    for tool, stats in summary.items():
+        line = f"{tool:<48}{stats['count']:>7}{stats['failed']:>8}"
+        line += "".join(f"{stats[f'p{p}'] * 1000:>10.1f}" for p in PERCENTILES)
+        line += f"{stats['max'] * 1000:>10.1f}{stats['mean_calls']:>8.0f}{stats['max_nodes']:>8}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    summary = summarize(read_records(argv[0] if argv else None))
+    if not summary:
+        print("No records found.")
+        return 1
+    print(format_summary(summary))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import nuke
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Number of upstream nodes whose layer lists are kept around
+MAX_CACHED_NODES = 64
+
+# Layers listed first by the pickers, in this order
+PRIORITY_LAYERS = ["rgb", "rgba", "alpha"]
+
+# Sub-channels given to layers created by the tools
+RGBA_CHANNELS = ("red", "green", "blue", "alpha")
+
+# Knob changes that never affect the channels a node delivers
+_COSMETIC_KNOBS = {
+    "xpos", "ypos", "selected", "label", "note_font", "note_font_size",
+    "note_font_color", "tile_color", "gl_color", "hide_input", "postage_stamp",
+    "showPanel", "hidePanel", "bookmark", "icon", "indicators", "help",
+}
+
+# Shuffle knobs that choose what is read, not which layers come out
+_SHUFFLE_SOURCE_KNOBS = {"in", "in1", "in2"}
+
+# Knobs that define what a Read delivers, part of its cache signature
+_READ_KNOBS = ("file", "proxy", "first", "last")
+
+# full node name -> {"signature": ..., "layers": [...], "priority": [...] or None,
+#                    "index": LayerNameIndex or None, "upstream": {full names} or None}
+_cache = OrderedDict()
+# Layers may be discovered on a worker thread, so cache access is serialised
+_lock = threading.RLock()
+_callbacks_registered = False
+
+def _signature(node):
+    """Cheap fingerprint of a node: what it is wired to and, for Reads, what it reads."""
+    inputs = tuple(inp.fullName() if inp else None
+                   for inp in (node.input(i) for i in range(node.inputs())))
+    if node.Class() == "Read":
+        return inputs, tuple(node[k].value() for k in _READ_KNOBS if node.knob(k))
+    return inputs, None
+
+def _upstream_names(node):
+    """
+    Full names of node and every node above it, the nodes whose edits can
+    change its channels. None for a node inside a Group, whose Input nodes
+    hide what feeds it, so any edit counts.
+    """
+    if "." in node.fullName():
+        return None
+    names = set()
+    pending = [node]
+    while pending:
+        current = pending.pop()
+        name = current.fullName()
+        if name in names:
+            continue
+        names.add(name)
+        pending.extend(inp for inp in (current.input(i) for i in range(current.inputs())) if inp is not None)
+    return names
+
+def _scan_layers(node):
+    """Collect the unique layer names of every channel on node, sorted."""
+    return sorted(set(ch.split('.')[0] for ch in nuke.channels(node)))
+
+def _cached_entry(key, signature):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry["signature"] != signature:
+            return None
+        _cache.move_to_end(key)
+        return entry
+
+def _get_entry(node):
+    key = node.fullName()
+    signature = _signature(node)
+    entry = _cached_entry(key, signature)
+    if entry is None:
+        # Scan outside the lock, this is the slow call into Nuke
+        entry = {"signature": signature, "layers": _scan_layers(node), "priority": None, "index": None,
+                 "upstream": _upstream_names(node)}
+        with _lock:
+            _cache[key] = entry
+            if len(_cache) > MAX_CACHED_NODES:
+                _cache.popitem(last=False)  # Evict the least recently used node
+    return entry
+
+def peek_layers(node):
+    """Returns the cached sorted layers of node, or None if they still need a scan."""
+    entry = _cached_entry(node.fullName(), _signature(node))
+    return None if entry is None else list(entry["layers"])
+
+def sort_with_priority(layers):
+    """Sorts layers alphabetically with rgb, rgba and alpha first."""
+    return sorted(layers, key=lambda x: (x not in PRIORITY_LAYERS, x))
+
+def get_layers(node, priority=False):
+    """
+    Returns the sorted layer names available on node.
+
+    Args:
+        node: Node whose channels are listed (usually the upstream of a Shuffle)
+        priority (bool): Put rgb, rgba and alpha first, as the Shuffle Shift picker does
+
+    Returns:
+        list: A new list of layer names, safe for the caller to modify
+    """
+    entry = _get_entry(node)
+    if not priority:
+        return list(entry["layers"])
+    if entry["priority"] is None:
+        entry["priority"] = sort_with_priority(entry["layers"])
+    return list(entry["priority"])
+
+class LayerNameIndex(object):
+    """
+    Prefix and substring index over layer names for type-ahead filtering.
+
+    Prefix queries are answered by bisecting the sorted names, longer substring
+    queries by intersecting trigram posting sets, so filtering stays fast with
+    thousands of layers. Results keep the order the layers were given in.
+    """
+
+    def __init__(self, layers):
+        self.layers = list(layers)
+        self._lowered = [name.lower() for name in self.layers]
+        self._sorted = sorted((name, i) for i, name in enumerate(self._lowered))
+        self._keys = [name for name, _ in self._sorted]
+        self._trigrams = {}
+        for i, name in enumerate(self._lowered):
+            for j in range(len(name) - 2):
+                self._trigrams.setdefault(name[j:j + 3], set()).add(i)
+
+    def _prefix_matches(self, text):
+        lo = bisect_left(self._keys, text)
+        hi = bisect_left(self._keys, text + "\uffff")
+        return sorted(self._sorted[k][1] for k in range(lo, hi))
+
+    def _substring_matches(self, text):
+        if len(text) < 3:
+            return [i for i, name in enumerate(self._lowered) if text in name]
+        postings = [self._trigrams.get(text[j:j + 3], set()) for j in range(len(text) - 2)]
+        candidates = set.intersection(*sorted(postings, key=len))
+        return sorted(i for i in candidates if text in self._lowered[i])
+
+    def search(self, text):
+        """Returns the layers matching text, prefix matches first, case-insensitive."""
+        text = text.strip().lower()
+        if not text:
+            return list(self.layers)
+        prefix = self._prefix_matches(text)
+        seen = set(prefix)
+        ordered = prefix + [i for i in self._substring_matches(text) if i not in seen]
+        return [self.layers[i] for i in ordered]
+
+def get_layer_index(node):
+    """Returns a cached LayerNameIndex over the priority-ordered layers of node."""
+    entry = _get_entry(node)
+    if entry["index"] is None:
+        if entry["priority"] is None:
+            entry["priority"] = sort_with_priority(entry["layers"])
+        entry["index"] = LayerNameIndex(entry["priority"])
+    return entry["index"]
+
+_BRACE_RE = re.compile(r"\{([^{}]*)\}")
+_RANGE_RE = re.compile(r"^(\d+)\.\.(\d+)$")
+
+def expand_layer_pattern(pattern):
+    """
+    Expand shell-style braces into layer names.
+
+    "light_{01..03}" gives light_01, light_02, light_03 (zero padding is kept)
+    and "{key,rim}_spec" gives key_spec, rim_spec. Several braces multiply out.
+    """
+    match = _BRACE_RE.search(pattern)
+    if not match:
+        return [pattern]
+    body = match.group(1)
+    range_match = _RANGE_RE.match(body)
+    if range_match:
+        start_text, end_text = range_match.groups()
+        width = len(start_text) if start_text.startswith("0") else 0
+        start, end = int(start_text), int(end_text)
+        step = 1 if end >= start else -1
+        options = [str(i).zfill(width) for i in range(start, end + step, step)]
+    else:
+        options = [option.strip() for option in body.split(',')]
+    head, tail = pattern[:match.start()], pattern[match.end():]
+    names = []
+    for option in options:
+        names.extend(expand_layer_pattern(head + option + tail))
+    return names
+
+def expand_layer_template(template, values):
+    """Fill a str.format template such as "M_{}" or "crypto_{:02d}" with each value."""
+    return [template.format(value) for value in values]
+
+def create_layers(names, channels=RGBA_CHANNELS, dry_run=False):
+    """
+    Create every layer in names that does not exist yet.
+
+    nuke.layers() is fetched once into a set, so registering dozens of layers
+    costs a single lookup call into Nuke.
+
+    Args:
+        names: Layer names, e.g. from expand_layer_pattern or expand_layer_template
+        channels: Sub-channel names for every layer, e.g. ("X", "Y", "Z"), or a
+                  dict of layer name -> sub-channel names (missing entries use RGBA)
+        dry_run (bool): Only report what would be created
+
+    Returns:
+        dict: "created" and "reused" lists of layer names, in the order given
+    """
+    existing = set(nuke.layers())
+    report = {"created": [], "reused": []}
+    for name in dict.fromkeys(names):
+        if name in existing:
+            report["reused"].append(name)
+            continue
+        layer_channels = channels.get(name, RGBA_CHANNELS) if isinstance(channels, dict) else channels
+        if not dry_run:
+            nuke.Layer(name, [f"{name}.{channel}" for channel in layer_channels])
+        existing.add(name)
+        report["created"].append(name)
+    return report
+
+def ensure_layers(names, dry_run=False):
+    """Create the missing layers in names with RGBA sub-channels and return their names."""
+    return create_layers(names, dry_run=dry_run)["created"]
+
+def invalidate(node=None):
+    """Drops the cached layers for node, or for every node when node is None."""
+    with _lock:
+        if node is None:
+            _cache.clear()
+        else:
+            _cache.pop(node.fullName(), None)
+
+def invalidate_downstream(node):
+    """Drops the cached layers of node and of every cached node below it."""
+    parts = node.fullName().split(".")
+    # An edit inside a Group also changes what the Groups around it deliver
+    names = {".".join(parts[:i]) for i in range(1, len(parts) + 1)}
+    with _lock:
+        stale = [key for key, entry in _cache.items()
+                 if entry["upstream"] is None or not names.isdisjoint(entry["upstream"])]
+        for key in stale:
+            del _cache[key]
+
+def _on_knob_changed():
+    knob = nuke.thisKnob()
+    if knob is None or knob.name() in _COSMETIC_KNOBS:
+        return
+    node = nuke.thisNode()
+    if node.Class() in ("Shuffle", "Shuffle2") and knob.name() in _SHUFFLE_SOURCE_KNOBS:
+        return  # The tools' own in/in1 picks leave the delivered layers alone
+    if node.Class() == "Root" or knob.name() == "name":
+        # Root settings such as the format reach every node, and a rename
+        # leaves the old name behind in the entries' upstream names
+        invalidate()
+        return
+    # Rewiring or editing a node only changes the channels of what is below it
+    invalidate_downstream(node)
+
+def register_callbacks():
+    """Install the callbacks that invalidate the cache when the graph changes."""
+    global _callbacks_registered
+    if _callbacks_registered:
+        return
+    nuke.addKnobChanged(_on_knob_changed)
+    nuke.addOnDestroy(invalidate)  # Called without a node, so it clears everything
+    nuke.addOnScriptLoad(invalidate)
+    nuke.addOnScriptClose(invalidate)
+    _callbacks_registered = True
+
+register_callbacks()
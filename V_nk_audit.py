@@ -0,0 +1,247 @@
+"""Offline audits of .nk scripts for the V tools, run without Nuke.
+
+    python V_nk_audit.py /shows/abc/comp            # every .nk below the folder
+    python V_nk_audit.py -c tags,shuffles a.nk b.nk
+    python V_nk_audit.py -j 16 --json report.json /shows/abc
+
+Checks:
+    tags       Tag_input nodes whose 'nc' is blank or names a missing node,
+               or which are not wired to the node they name
+    shuffles   Shuffle/Shuffle2 layers the script does not define
+    backdrops  Backdrops overlapping without one containing the other, empty
+               backdrops, nodes crossing a backdrop edge, and nested backdrops
+               drawn behind the backdrop around them
+
+Each script is parsed once, in a single streaming pass shared by all checks,
+and scripts are spread over a process pool. The exit code is 1 when any issue
+or unreadable script was found.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from V_nk_parser import NkParser, NkParseError
+from V_geometry import SpatialGrid, rect_contains
+
+# Layers Nuke defines itself, which scripts never declare with add_layer
+BUILTIN_LAYERS = {"none", "all", "rgb", "rgba", "alpha", "depth", "motion", "forward",
+                  "backward", "mask", "deep", "other"}
+
+# Layer knobs per Shuffle class, as in V_shuffle_ops
+SHUFFLE_LAYER_KNOBS = {
+    "Shuffle": ("in", "in2", "out", "out2"),
+    "Shuffle2": ("in1", "in2", "out1", "out2"),
+}
+
+# Size of a node in the DAG, which .nk files do not store
+NODE_WIDTH = 80
+NODE_HEIGHT = 18
+DOT_SIZE = 12
+
+# Files picked up when a folder is given
+SCRIPT_EXTENSIONS = (".nk",)
+
+def _issue(check, node, message):
+    return {"check": check, "node": node.full_name if hasattr(node, "full_name") else node,
+            "line": getattr(node, "line", None), "message": message}
+
+class TagAudit(object):
+    """Finds Tag_input nodes that point nowhere or are wired elsewhere."""
+    name = "tags"
+    knobs = ("nc",)
+
+    def __init__(self):
+        self.names = set()
+        self.tags = []
+
+    def visit(self, node):
+        self.names.add(node.full_name)
+        if node.node_class == "NoOp" and "nc" in node.knobs:
+            self.tags.append((node, node.knobs["nc"].strip(), node.inputs[0] if node.inputs else None))
+
+    def finish(self, parser):
+        issues = []
+        for tag, target, wired_to in self.tags:
+            # 'nc' names a node in the tag's own group, like nuke.toNode from there
+            full_target = f"{tag.group}.{target}" if tag.group else target
+            if not target:
+                issues.append(_issue(self.name, tag, "no target set in 'nc'"))
+            elif full_target not in self.names:
+                issues.append(_issue(self.name, tag, f"'nc' points at missing node {target}"))
+            elif wired_to != full_target:
+                wired_text = f"wired to {wired_to}" if wired_to else "not connected"
+                issues.append(_issue(self.name, tag, f"{wired_text}, but 'nc' is {target}"))
+        return issues
+
+class ShuffleAudit(object):
+    """Finds Shuffle layers that the script does not define."""
+    name = "shuffles"
+    knobs = tuple(sorted(set(k for names in SHUFFLE_LAYER_KNOBS.values() for k in names)))
+
+    def __init__(self):
+        self.uses = []
+
+    def visit(self, node):
+        for knob_name in SHUFFLE_LAYER_KNOBS.get(node.node_class, ()):
+            value = node.knobs.get(knob_name)
+            if value:
+                self.uses.append((node, knob_name, value.split(".")[0]))
+
+    def finish(self, parser):
+        # add_layer lines can come after a node using them, so check at the end
+        known = BUILTIN_LAYERS | set(parser.layers)
+        return [_issue(self.name, node, f"'{knob_name}' uses layer {layer}, which the script does not define")
+                for node, knob_name, layer in self.uses if layer not in known]
+
+class BackdropAudit(object):
+    """Finds backdrop layout problems within each group."""
+    name = "backdrops"
+    knobs = ("bdwidth", "bdheight", "z_order")
+
+    def __init__(self):
+        self.backdrops = {}   # group -> [(node, rect, z_order)]
+        self.nodes = {}       # group -> [rect]
+
+    def visit(self, node):
+        x, y = node.xpos, node.ypos
+        if x is None or y is None:
+            return
+        if node.node_class == "BackdropNode":
+            rect = (x, y, x + node.int_knob("bdwidth", 100), y + node.int_knob("bdheight", 100))
+            self.backdrops.setdefault(node.group, []).append((node, rect, node.int_knob("z_order", 0)))
+        elif node.node_class != "StickyNote":
+            width, height = (DOT_SIZE, DOT_SIZE) if node.node_class == "Dot" else (NODE_WIDTH, NODE_HEIGHT)
+            self.nodes.setdefault(node.group, []).append((x, y, x + width, y + height))
+
+    def finish(self, parser):
+        issues = []
+        for group, backdrops in self.backdrops.items():
+            node_grid = SpatialGrid(cell_size=200)
+            for i, rect in enumerate(self.nodes.get(group, ())):
+                node_grid.insert(i, rect)
+            backdrop_grid = SpatialGrid(cell_size=500)
+            for i, (_, rect, _) in enumerate(backdrops):
+                backdrop_grid.insert(i, rect)
+
+            for i, (node, rect, z_order) in enumerate(backdrops):
+                for j in sorted(backdrop_grid.query(rect)):
+                    other, other_rect, other_z = backdrops[j]
+                    if j == i:
+                        continue
+                    if rect_contains(other_rect, rect) and other_rect != rect:
+                        if z_order <= other_z:
+                            issues.append(_issue(self.name, node, f"drawn behind {other.full_name}, which contains it"))
+                    elif j > i and not rect_contains(rect, other_rect):
+                        issues.append(_issue(self.name, node, f"overlaps {other.full_name}"))
+
+                touching = [node_grid.rects[k] for k in node_grid.query(rect)]
+                inside = sum(1 for r in touching if rect_contains(rect, r))
+                if not inside:
+                    issues.append(_issue(self.name, node, "is empty"))
+                crossing = len(touching) - inside
+                if crossing:
+                    issues.append(_issue(self.name, node, f"{crossing} node(s) cross its edge"))
+        return issues
+
+CHECKS = {"tags": TagAudit, "shuffles": ShuffleAudit, "backdrops": BackdropAudit}
+
+def audit_script(path, checks=tuple(CHECKS)):
+    """
+    Runs the checks over one script in a single parse.
+
+    Returns:
+        dict: "script", "nodes", "issues" (list of dicts with "check", "node",
+              "line" and "message"), "seconds" and "error" (None if it parsed)
+    """
+    audits = [CHECKS[check]() for check in checks]
+    knobs = set(knob for audit in audits for knob in audit.knobs)
+    start = time.perf_counter()
+    result = {"script": path, "nodes": 0, "issues": [], "seconds": 0.0, "error": None}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            parser = NkParser(f, knobs)
+            for node in parser:
+                for audit in audits:
+                    audit.visit(node)
+        result["nodes"] = parser.node_count
+        result["issues"] = [issue for audit in audits for issue in audit.finish(parser)]
+    except (IOError, OSError, NkParseError) as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def find_scripts(paths):
+    """Expands folders into the .nk files below them, skipping autosaves."""
+    scripts = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                scripts.extend(os.path.join(root, name) for name in sorted(files)
+                               if name.endswith(SCRIPT_EXTENSIONS))
+        else:
+            scripts.append(path)
+    return scripts
+
+def audit_paths(paths, checks=tuple(CHECKS), workers=None):
+    """
+    Audits every script under paths, in parallel when workers is not 1.
+
+    Args:
+        paths (list): .nk files and folders to search
+        checks (tuple): Names from CHECKS
+        workers (int): Processes to use, None for one per CPU
+
+    Returns:
+        list: One audit_script result per script, in path order
+    """
+    scripts = find_scripts(paths)
+    run = partial(audit_script, checks=tuple(checks))
+    if workers == 1 or len(scripts) < 2:
+        return [run(script) for script in scripts]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Small scripts parse in milliseconds, so hand them out in chunks
+        chunksize = max(1, len(scripts) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(run, scripts, chunksize=chunksize))
+
+def format_report(results):
+    lines = []
+    for result in results:
+        if result["error"]:
+            lines.append(f"{result['script']}: could not be read: {result['error']}")
+            continue
+        for issue in result["issues"]:
+            lines.append(f"{result['script']}:{issue['line']}: [{issue['check']}] {issue['node']} {issue['message']}")
+    issues = sum(len(r["issues"]) for r in results)
+    errors = sum(1 for r in results if r["error"])
+    nodes = sum(r["nodes"] for r in results)
+    lines.append(f"{len(results)} script(s), {nodes} node(s): {issues} issue(s), {errors} unreadable")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit .nk scripts for broken tags, missing Shuffle layers and backdrop layout.")
+    parser.add_argument("paths", nargs="+", help=".nk files or folders to search")
+    parser.add_argument("-c", "--checks", default=",".join(CHECKS),
+                        help=f"Comma separated checks to run (default: {','.join(CHECKS)})")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--json", dest="json_path", help="Also write the full results to this JSON file")
+    args = parser.parse_args(argv)
+
+    checks = [c.strip() for c in args.checks.split(",") if c.strip()]
+    unknown = [c for c in checks if c not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check(s): {', '.join(unknown)}")
+
+    results = audit_paths(args.paths, checks, args.jobs)
+    print(format_report(results))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(r["issues"] or r["error"] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
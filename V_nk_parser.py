@@ -0,0 +1,266 @@
+"""Streaming reader for Nuke's .nk script format, usable without Nuke.
+
+A .nk file is a Tcl-like list of commands. Each node is a block
+
+    Grade {
+     name Grade1
+     xpos 120
+     ypos -40
+    }
+
+that takes its inputs from a stack (the previous node, "push $N..." for a
+saved one, "push 0" for an empty input) and pushes itself when it ends. Group
+contents follow the Group's block up to "end_group". Layers are declared with
+"add_layer {name name.red ...}".
+
+The file is read line by line and every node is yielded as soon as its block
+closes. Only the knobs asked for are kept, so large knobs (Roto curves,
+embedded Python, window layouts) are skipped without being stored and memory
+stays bounded however large the script is.
+"""
+import re
+
+# Knobs every node keeps: needed to name it, wire it and place it
+BASE_KNOBS = ("name", "inputs", "xpos", "ypos")
+
+# Node classes whose contents follow their block, up to "end_group"
+GROUP_CLASSES = {"Group", "LiveGroup"}
+
+_NODE_START_RE = re.compile(r"^([A-Za-z_][\w.]*)\s*\{\s*$")
+_SET_RE = re.compile(r"^set\s+(\S+)\s+\[stack\s+(\d+)\]")
+_CLONE_RE = re.compile(r"^clone\s+(\S+)(?:\s+([A-Za-z_][\w.]*))?\s*\{\s*$")
+_SPECIAL_CHARS = re.compile(r'[{}"\\]')
+_ESCAPE_RE = re.compile(r"\\(.)")
+_ESCAPES = {"n": "\n", "t": "\t"}
+
+class NkParseError(ValueError):
+    pass
+
+def _scan(text, depth):
+    """
+    Returns the brace depth after text, starting from depth.
+
+    Follows Tcl quoting: braces inside a "quoted word" at depth 0 do not count,
+    quotes inside braces are ordinary characters, and a backslash escapes the
+    next character.
+    """
+    quoted = False
+    escaped_at = -1
+    # Only braces, quotes and backslashes matter, so jump between them
+    for match in _SPECIAL_CHARS.finditer(text):
+        position = match.start()
+        if position == escaped_at:
+            continue
+        char = match.group()
+        if char == "\\":
+            escaped_at = position + 1
+        elif quoted:
+            if char == '"':
+                quoted = False
+        elif char == '"' and depth == 0:
+            quoted = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+    return depth
+
+def unquote(value):
+    """Strips one level of Tcl braces or quotes from a knob value."""
+    value = value.strip()
+    if len(value) >= 2:
+        if value[0] == "{" and value[-1] == "}" and _scan(value[1:-1], 0) == 0:
+            return value[1:-1]
+        if value[0] == '"' and value[-1] == '"':
+            return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), value[1:-1])
+    return value
+
+def _input_count(value):
+    # "2" or "2+1" (two inputs plus a mask)
+    try:
+        return sum(int(part) for part in value.split("+"))
+    except ValueError:
+        raise NkParseError(f"bad inputs value {value!r}")
+
+class NkNode(object):
+    """
+    One node read from a script.
+
+    Attributes:
+        node_class (str): e.g. "Shuffle2"
+        knobs (dict): Kept knob name -> value, braces and quotes removed
+        inputs (list): Full names of the input nodes, None for empty inputs
+        group (str): Full name of the enclosing group, "" at root level
+        line (int): Line the node block starts on
+    """
+
+    def __init__(self, node_class, knobs, inputs, group, line):
+        self.node_class = node_class
+        self.knobs = knobs
+        self.inputs = inputs
+        self.group = group
+        self.line = line
+
+    @property
+    def name(self):
+        return self.knobs.get("name", "")
+
+    @property
+    def full_name(self):
+        return f"{self.group}.{self.name}" if self.group else self.name
+
+    def knob(self, name, default=None):
+        return self.knobs.get(name, default)
+
+    def int_knob(self, name, default=None):
+        try:
+            return int(float(self.knobs[name]))
+        except (KeyError, ValueError):
+            return default
+
+    @property
+    def xpos(self):
+        return self.int_knob("xpos")
+
+    @property
+    def ypos(self):
+        return self.int_knob("ypos")
+
+    def __repr__(self):
+        return f"<NkNode {self.node_class} {self.full_name}>"
+
+class NkParser(object):
+    """
+    Iterates over the nodes of a .nk stream in one pass.
+
+        with open(path) as f:
+            parser = NkParser(f, knobs=("nc", "label"))
+            for node in parser:
+                ...
+        parser.layers  # layers declared with add_layer, in file order
+
+    Args:
+        stream: Iterable of text lines, e.g. an open file
+        knobs: Extra knob names to keep besides BASE_KNOBS, or None to keep all
+    """
+
+    def __init__(self, stream, knobs=None):
+        self.stream = stream
+        self.keep = None if knobs is None else set(BASE_KNOBS) | set(knobs)
+        self.layers = []
+        self.version = None
+        self.node_count = 0
+
+    def __iter__(self):
+        stack = []        # (full name, class) of the nodes on the input stack
+        saved = {}        # "set" variables -> (full name, class)
+        groups = []       # Outer (stack, saved, group name) while inside a group
+        group = ""
+        lines = iter(self.stream)
+        line_number = 0
+
+        def skip_block(depth):
+            nonlocal line_number
+            while depth > 0:
+                line_number += 1
+                depth = _scan(next(lines), depth)
+
+        for raw in lines:
+            line_number += 1
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            match = _NODE_START_RE.match(line)
+            clone = None if match else _CLONE_RE.match(line)
+            if match or clone:
+                if match:
+                    node_class = match.group(1)
+                else:
+                    source = saved.get(clone.group(1).lstrip("$"))
+                    node_class = clone.group(2) or (source[1] if source else "clone")
+                start_line = line_number
+                knobs, read = self._read_block(lines, start_line)
+                line_number += read
+                if node_class == "Root":
+                    continue  # Script settings, not part of the graph
+                count = _input_count(knobs["inputs"]) if "inputs" in knobs else 1
+                inputs = []
+                for _ in range(count):
+                    entry = stack.pop() if stack else None
+                    inputs.append(entry[0] if entry else None)
+                inputs.reverse()  # The last input written is the top of the stack
+                node = NkNode(node_class, knobs, inputs, group, start_line)
+                stack.append((node.full_name, node_class))
+                self.node_count += 1
+                if node_class in GROUP_CLASSES:
+                    groups.append((stack, saved, group))
+                    stack, saved, group = [], {}, node.full_name
+                yield node
+                continue
+
+            command, _, rest = line.partition(" ")
+            if command == "push":
+                rest = rest.strip()
+                if rest == "0":
+                    stack.append(None)
+                else:
+                    stack.append(saved.get(rest.lstrip("$")))
+            elif command == "set":
+                match = _SET_RE.match(line)
+                if match:
+                    depth = int(match.group(2))
+                    saved[match.group(1)] = stack[-1 - depth] if len(stack) > depth else None
+            elif command == "end_group":
+                if not groups:
+                    raise NkParseError(f"line {line_number}: end_group outside a group")
+                stack, saved, group = groups.pop()
+            elif command == "add_layer":
+                names = unquote(rest).split()
+                if names:
+                    self.layers.append(names[0])
+            elif command == "version":
+                self.version = rest.strip()
+            else:
+                # Window layouts, cut_paste_input and other script-level
+                # commands, possibly spread over several lines
+                try:
+                    skip_block(_scan(line, 0))
+                except StopIteration:
+                    raise NkParseError(f"line {line_number}: unterminated {command}")
+
+        if groups:
+            raise NkParseError(f"missing end_group for {group}")
+
+    def _read_block(self, lines, start_line):
+        """Reads a node block after its opening line. Returns the kept knobs and lines read."""
+        keep = self.keep
+        knobs = {}
+        read = 0
+        for raw in lines:
+            read += 1
+            line = raw.strip()
+            if line == "}":
+                return knobs, read
+            name, _, value = line.partition(" ")
+            depth = _scan(value, 0)
+            wanted = keep is None or name in keep
+            parts = [value] if wanted else None
+            while depth > 0:
+                try:
+                    raw = next(lines)
+                except StopIteration:
+                    break
+                read += 1
+                depth = _scan(raw, depth)
+                if wanted:
+                    parts.append(raw.rstrip("\n"))
+            if wanted:
+                knobs[name] = unquote("\n".join(parts))
+        raise NkParseError(f"line {start_line}: node block is not closed")
+
+def iter_nodes(path, knobs=None):
+    """Yields the NkNodes of the script at path, keeping BASE_KNOBS plus knobs."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for node in NkParser(f, knobs):
+            yield node
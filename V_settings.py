@@ -0,0 +1,180 @@
+"""Settings store shared by the V_commands tools.
+
+Each tool gets a named store whose values are layered, lowest priority first:
+the tool's built-in defaults, the site file, the show file, then the user's own
+file. Only the user layer is ever written. Writes are debounced and atomic
+(temp file plus rename), so dragging a spinner costs one write, not dozens,
+and a crash mid-write never leaves a half-written file behind.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+
+# Seconds of quiet after the last change before the user file is written
+WRITE_DELAY = 0.5
+
+# JSON files with per-site and per-show defaults, keyed by store name:
+# {"backdrop": {"padding": 80}, ...}
+SITE_SETTINGS_ENV = "V_TOOLS_SITE_SETTINGS"
+SHOW_SETTINGS_ENV = "V_TOOLS_SHOW_SETTINGS"
+
+_MISSING = object()
+_stores = {}
+_stores_lock = threading.Lock()
+
+def user_settings_path(name):
+    """Default per-user settings file for a store, e.g. ~/.v_backdrop_settings.json."""
+    return os.path.join(os.path.expanduser("~"), f".v_{name}_settings.json")
+
+def _read_json(path):
+    """Reads a JSON object from path. Returns None if missing, raises ValueError if corrupt."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (IOError, OSError):
+        return None
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    return data
+
+def write_json_atomic(path, data):
+    """Writes data as JSON next to path, then renames it over path in one step."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _shared_layer(env_var, name):
+    path = os.environ.get(env_var)
+    if not path:
+        return {}
+    try:
+        data = _read_json(path) or {}
+    except ValueError as e:
+        print(f"Ignoring settings file {e}")
+        return {}
+    section = data.get(name, {})
+    return section if isinstance(section, dict) else {}
+
+class SettingsStore(object):
+    """
+    In-memory settings for one tool, saved to disk in the background.
+
+    Args:
+        name (str): Store name, also the section looked up in site/show files
+        defaults (dict): Built-in values used when no file provides one
+        path (str): User settings file, defaults to user_settings_path(name)
+        on_error (callable): Called with the exception if a background write fails
+    """
+
+    def __init__(self, name, defaults=None, path=None, on_error=None):
+        self.name = name
+        self.path = path or user_settings_path(name)
+        self.on_error = on_error
+        self._lock = threading.RLock()
+        # Held from copying the settings until they are on disk, so an older copy
+        # still being written by the timer thread cannot replace a newer one
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+        self._base = dict(defaults or {})
+        self._base.update(_shared_layer(SITE_SETTINGS_ENV, name))
+        self._base.update(_shared_layer(SHOW_SETTINGS_ENV, name))
+        self._user = self._load_user()
+
+    def _load_user(self):
+        try:
+            return _read_json(self.path) or {}
+        except ValueError as e:
+            # Keep the damaged file for inspection instead of silently dropping it
+            backup = self.path + ".corrupt"
+            print(f"Settings file {e}, moved to {backup}")
+            try:
+                os.replace(self.path, backup)
+            except OSError:
+                pass
+            return {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._user:
+                return self._user[key]
+            return self._base.get(key, default)
+
+    def as_dict(self):
+        """Returns the merged settings as a new dict."""
+        with self._lock:
+            merged = dict(self._base)
+            merged.update(self._user)
+            return merged
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        """Stores values in the user layer and schedules a write if anything changed."""
+        with self._lock:
+            changed = {k: v for k, v in values.items() if self.get(k, _MISSING) != v}
+            if not changed:
+                return
+            self._user.update(changed)
+            self._dirty = True
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(WRITE_DELAY, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Writes pending changes now. Safe to call at any time."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                data = dict(self._user)
+                self._dirty = False
+            try:
+                write_json_atomic(self.path, data)
+            except (IOError, OSError) as e:
+                with self._lock:
+                    self._dirty = True  # Try again with the next change or at exit
+                if self.on_error:
+                    self.on_error(e)
+                else:
+                    print(f"Error saving settings: {e}")
+
+def get_store(name, defaults=None, path=None, on_error=None):
+    """Returns the shared SettingsStore for name, creating it on first use."""
+    with _stores_lock:
+        store = _stores.get(name)
+        if store is None:
+            store = SettingsStore(name, defaults, path, on_error)
+            _stores[name] = store
+        return store
+
+def flush_all():
+    """Writes every store's pending changes, used at interpreter exit."""
+    for store in list(_stores.values()):
+        store.flush()
+
+atexit.register(flush_all)
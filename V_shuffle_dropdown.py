@@ -1,20 +1,188 @@
 import nuke
+import re
+import threading
 from PySide2 import QtWidgets, QtCore
+import V_layer_catalog
+import V_instrument
+import V_dialog_manager
+from V_shuffle_ops import (get_available_channel_layers, is_new_shuffle, apply_shuffle_layers, split_all_layers,
+                           remap_shuffle_layers, format_remap_report, parse_remap_text)
+
+def discover_layers_async(node, on_done, cancel_event):
+    """
+    Discover the channel layers of node's input on a worker thread.
+
+    on_done(layers) runs once on the main thread with the sorted layer names.
+    It does not run once cancel_event is set, so callers can close their UI
+    at any time.
+    """
+    def deliver(layers):
+        if not cancel_event.is_set():
+            on_done(layers)
+
+    def worker():
+        try:
+            layers = get_available_channel_layers(node)
+        except Exception as e:
+            print(f"Layer discovery failed: {e}")
+            layers = []
+        if not cancel_event.is_set():
+            nuke.executeInMainThread(deliver, args=(layers,))
+
+    thread = threading.Thread(target=worker, name="V_shuffle_dropdown layer discovery")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+# Placeholder in the custom output field, ignored when applying
+DEFAULT_CUSTOM_CHANNEL = "M_customChannel"
+
+class ShuffleDialog(QtWidgets.QDialog):
+    """Channel selector for old or new Shuffle nodes, built once and reloaded for each node."""
+
+    def __init__(self, parent=None):
+        super(ShuffleDialog, self).__init__(parent)
+        self.shuffle_node = None
+        self.current_in = ""
+        self.current_out = ""
+        self._cancel_event = None
+
+        self.setWindowTitle("Shuffle Channel Selector")
+        self.setFixedWidth(300)
+
+        # Main layout with padding
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(15)
+
+        # Style sheet
+        self.setStyleSheet("""
+            QLabel { font-size: 12px; font-weight: bold; color: #999; }
+            QComboBox, QLineEdit { padding: 5px; border: 1px solid #ccc; border-radius: 3px; }
+            QPushButton { padding: 5px; background-color: #4CAF50; color: white; border: none; border-radius: 3px; }
+            QPushButton:hover { background-color: #45a049; }
+        """)
+
+        # Loading state, shown until layer discovery finishes
+        self.status_label = QtWidgets.QLabel("Loading layers...")
+        layout.addWidget(self.status_label)
+
+        # Input channel dropdown, filled as layers arrive
+        in_label = QtWidgets.QLabel("Select Input Channel (in):")
+        in_label.setAlignment(QtCore.Qt.AlignLeft)
+        self.in_channel_list = QtWidgets.QComboBox()
+        layout.addWidget(in_label)
+        layout.addWidget(self.in_channel_list)
+
+        # Output channel dropdown, include current 'out' even if custom
+        out_label = QtWidgets.QLabel("Select Output Channel (out):")
+        out_label.setAlignment(QtCore.Qt.AlignLeft)
+        self.out_channel_list = QtWidgets.QComboBox()
+        layout.addWidget(out_label)
+        layout.addWidget(self.out_channel_list)
+
+        # Custom output channel
+        custom_label = QtWidgets.QLabel("Custom Output Channel (optional):")
+        custom_label.setAlignment(QtCore.Qt.AlignLeft)
+        self.custom_channel_input = QtWidgets.QLineEdit()
+        layout.addWidget(custom_label)
+        layout.addWidget(self.custom_channel_input)
+
+        # Apply button
+        self.apply_btn = QtWidgets.QPushButton("Apply")
+        self.apply_btn.setFixedWidth(100)
+        layout.addWidget(self.apply_btn, alignment=QtCore.Qt.AlignCenter)
+
+        # Stretch to keep content neat
+        layout.addStretch()
+
+        self.apply_btn.clicked.connect(self.apply_selection)
+        # Stop delivering layers once the dialog closes, however it closes
+        self.finished.connect(self._cancel_discovery)
+        self.setLayout(layout)
+
+    def _cancel_discovery(self, *args):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self._cancel_event = None
+
+    def load(self, shuffle_node):
+        """
+        Resets the dialog for shuffle_node and starts listing its input's layers.
+
+        Returns:
+            bool: False if the input is known to have no layers
+        """
+        self._cancel_discovery()
+        self.shuffle_node = shuffle_node
+
+        # Determine if it's a new or old Shuffle node
+        is_new = is_new_shuffle(shuffle_node)
+        self.current_in = shuffle_node['in1' if is_new else 'in'].value()
+        self.current_out = shuffle_node['out1' if is_new else 'out'].value()
+
+        self.status_label.show()
+        self.in_channel_list.clear()
+        self.out_channel_list.clear()
+        self.in_channel_list.setEnabled(False)
+        self.out_channel_list.setEnabled(False)
+        if self.current_out:
+            self.out_channel_list.addItem(self.current_out)  # Current out sits at the top until we know it is a regular layer
+        self.custom_channel_input.setText(DEFAULT_CUSTOM_CHANNEL)  # Default text
+        self.apply_btn.setEnabled(False)
+
+        # Discover layers off the UI thread unless the catalog already has them
+        layers = V_layer_catalog.peek_layers(shuffle_node.input(0))
+        if layers is not None:
+            if not layers:
+                return False
+            self.finish_loading(layers)
+        else:
+            self._cancel_event = threading.Event()
+            discover_layers_async(shuffle_node, self.finish_loading, self._cancel_event)
+        return True
+
+    def finish_loading(self, layers):
+        if not layers:
+            nuke.message("No input connected to the Shuffle node or no channels found!")
+            self.reject()
+            return
+        self.in_channel_list.addItems(layers)
+        self.out_channel_list.addItems(layers)
+        self.in_channel_list.setEnabled(True)
+        self.out_channel_list.setEnabled(True)
+        if self.current_in in layers:
+            self.in_channel_list.setCurrentText(self.current_in)  # Default to current 'in' or 'in1'
+        if self.current_out in layers:
+            self.out_channel_list.removeItem(0)  # Drop the provisional top entry
+        if self.current_out:
+            self.out_channel_list.setCurrentText(self.current_out)  # Default to current 'out' or 'out1'
+        elif 'rgba' in layers:
+            self.out_channel_list.setCurrentText('rgba')  # Fallback to 'rgba' if no current value
+        self.status_label.hide()
+        self.apply_btn.setEnabled(True)
+
+    @V_instrument.instrumented("V_shuffle_dropdown.apply_selection")
+    def apply_selection(self):
+        in_channel = self.in_channel_list.currentText()
+        out_channel = self.out_channel_list.currentText()
+        custom_channel = self.custom_channel_input.text().strip()
 
-def get_available_channel_layers(node):
-    """Get unique channel layers from the node's input."""
-    if not node.input(0):
-        return []
-    channels = nuke.channels(node.input(0))
-    layers = sorted(list(set([ch.split('.')[0] for ch in channels if '.' in ch])))
-    return layers
-
-def is_new_shuffle(node):
-    """Check if the node is a new-style Shuffle (Nuke 13+)."""
-    return 'in1' in node.knobs()
+        # Handle custom channel
+        if custom_channel and custom_channel != DEFAULT_CUSTOM_CHANNEL:
+            # Create a new layer with RGBA sub-channels if it does not exist yet
+            if apply_shuffle_layers(self.shuffle_node, in_channel, custom_channel, create_out=True):
+                print(f"Created new channel '{custom_channel}'.")
+            else:
+                print(f"Channel '{custom_channel}' already exists.")
+        else:
+            # Use dropdown value
+            apply_shuffle_layers(self.shuffle_node, in_channel, out_channel)
+        self.accept()
 
+@V_instrument.instrumented()
 def create_shuffle_ui():
-    """Build a UI to select channel layers for old or new Shuffle nodes."""
+    """Show the channel selector for the selected old or new Shuffle node."""
     # Check if a Shuffle node is selected
     try:
         shuffle_node = nuke.selectedNode()
@@ -25,116 +193,47 @@ def create_shuffle_ui():
         nuke.message("Please select a Shuffle node!")
         return
 
-    # Get available channel layers from input
-    layers = get_available_channel_layers(shuffle_node)
-    if not layers:
+    if not shuffle_node.input(0):
         nuke.message("No input connected to the Shuffle node or no channels found!")
         return
 
-    # Determine if it's a new or old Shuffle node
-    is_new = is_new_shuffle(shuffle_node)
-    current_in = shuffle_node['in1' if is_new else 'in'].value()
-    current_out = shuffle_node['out1' if is_new else 'out'].value()
-
-    # Create a Qt dialog
+    # One dialog per session, parented to Nuke's main window and reused
     app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
-    dialog = QtWidgets.QDialog()
-    dialog.setWindowTitle("Shuffle Channel Selector")
-    dialog.setFixedWidth(300)
-
-    # Main layout with padding
-    layout = QtWidgets.QVBoxLayout()
-    layout.setContentsMargins(10, 10, 10, 10)
-    layout.setSpacing(15)
-
-    # Style sheet
-    dialog.setStyleSheet("""
-        QLabel { font-size: 12px; font-weight: bold; color: #999; }
-        QComboBox, QLineEdit { padding: 5px; border: 1px solid #ccc; border-radius: 3px; }
-        QPushButton { padding: 5px; background-color: #4CAF50; color: white; border: none; border-radius: 3px; }
-        QPushButton:hover { background-color: #45a049; }
-    """)
-
-    # Input channel dropdown
-    in_label = QtWidgets.QLabel("Select Input Channel (in):")
-    in_label.setAlignment(QtCore.Qt.AlignLeft)
-    in_channel_list = QtWidgets.QComboBox()
-    in_channel_list.addItems(layers)
-    if current_in in layers:
-        in_channel_list.setCurrentText(current_in)  # Default to current 'in' or 'in1'
-    layout.addWidget(in_label)
-    layout.addWidget(in_channel_list)
-
-    # Output channel dropdown, include current 'out' even if custom
-    out_label = QtWidgets.QLabel("Select Output Channel (out):")
-    out_label.setAlignment(QtCore.Qt.AlignLeft)
-    out_channel_list = QtWidgets.QComboBox()
-    # Add current out to the list if not already in layers
-    out_layers = layers.copy()
-    if current_out and current_out not in out_layers:
-        out_layers.insert(0, current_out)  # Add current out at the top
-    out_channel_list.addItems(out_layers)
-    if current_out:
-        out_channel_list.setCurrentText(current_out)  # Default to current 'out' or 'out1'
-    elif 'rgba' in out_layers:
-        out_channel_list.setCurrentText('rgba')  # Fallback to 'rgba' if no current value
-    layout.addWidget(out_label)
-    layout.addWidget(out_channel_list)
-
-    # Custom output channel
-    custom_label = QtWidgets.QLabel("Custom Output Channel (optional):")
-    custom_label.setAlignment(QtCore.Qt.AlignLeft)
-    custom_channel_input = QtWidgets.QLineEdit()
-    custom_channel_input.setText("M_customChannel")  # Default text
-    layout.addWidget(custom_label)
-    layout.addWidget(custom_channel_input)
-
-    # Apply button
-    apply_btn = QtWidgets.QPushButton("Apply")
-    apply_btn.setFixedWidth(100)
-    layout.addWidget(apply_btn, alignment=QtCore.Qt.AlignCenter)
-
-    # Stretch to keep content neat
-    layout.addStretch()
-
-    def apply_selection():
-        in_channel = in_channel_list.currentText()
-        out_channel = out_channel_list.currentText()
-        custom_channel = custom_channel_input.text().strip()
-
-        # Set the input knob based on node type
-        if is_new:
-            shuffle_node['in1'].setValue(in_channel)
-        else:
-            shuffle_node['in'].setValue(in_channel)
-
-        # Handle custom channel
-        if custom_channel and custom_channel != "M_customChannel":
-            if custom_channel not in nuke.layers():
-                # Create a new layer with RGBA sub-channels
-                new_c = [f"{custom_channel}.red", f"{custom_channel}.green", 
-                         f"{custom_channel}.blue", f"{custom_channel}.alpha"]
-                nuke.Layer(custom_channel, new_c)
-                print(f"Created new channel '{custom_channel}'.")
-            else:
-                print(f"Channel '{custom_channel}' already exists.")
-            # Set the output knob based on node type
-            if is_new:
-                shuffle_node['out1'].setValue(custom_channel)
-            else:
-                shuffle_node['out'].setValue(custom_channel)
-        else:
-            # Use dropdown value
-            if is_new:
-                shuffle_node['out1'].setValue(out_channel)
-            else:
-                shuffle_node['out'].setValue(out_channel)
-
-        # Update UI
-        nuke.updateUI()
-        dialog.accept()
-
-    apply_btn.clicked.connect(apply_selection)
-    dialog.setLayout(layout)
+    dialog = V_dialog_manager.get_dialog("shuffle_dropdown", ShuffleDialog)
+    if not dialog.load(shuffle_node):
+        nuke.message("No input connected to the Shuffle node or no channels found!")
+        return
     dialog.exec_()
 
+@V_instrument.instrumented()
+def split_all_layers_ui():
+    """Ask for an optional layer filter and split the selected node into Shuffles."""
+    try:
+        source = nuke.selectedNode()
+    except ValueError:
+        nuke.message("Please select a node to split!")
+        return
+
+    layer_filter = nuke.getInput("Layers to split (glob patterns, empty for all):", "")
+    if layer_filter is None:
+        return  # Cancelled
+    if not split_all_layers(source, layer_filter):
+        nuke.message("No matching layers found!")
+
+@V_instrument.instrumented()
+def remap_shuffle_layers_ui():
+    """Ask for remap rules, show a dry-run report and apply it on confirmation."""
+    text = nuke.getInput("Layer remap (old=new, re:pattern=replacement):", "")
+    if not text:
+        return
+    mapping, rules = parse_remap_text(text)
+    try:
+        preview = remap_shuffle_layers(mapping, rules, dry_run=True)
+    except re.error as e:
+        nuke.message(f"Invalid regex: {e}")
+        return
+    if not preview["changes"]:
+        nuke.message("No Shuffle layers matched.")
+        return
+    if nuke.ask(format_remap_report(preview) + "\n\nApply these changes?"):
+        remap_shuffle_layers(mapping, rules, nodes=[c[0] for c in preview["changes"]])
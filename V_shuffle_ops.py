@@ -0,0 +1,207 @@
+"""Shuffle layer operations shared by the Shuffle dialogs, the panel and batch runs.
+
+Nothing here imports Qt, so headless `nuke -t` runs can use it.
+"""
+import nuke
+import re
+from fnmatch import fnmatch
+import V_layer_catalog
+from V_batch_edit import BatchEdit
+
+# Layer knobs rewritten by remap_shuffle_layers, per Shuffle class
+SHUFFLE_LAYER_KNOBS = {
+    "Shuffle": ("in", "in2", "out", "out2"),
+    "Shuffle2": ("in1", "in2", "out1", "out2"),
+}
+
+# Grid used by split_all_layers
+SPLIT_COLUMNS = 8
+SPLIT_COLUMN_WIDTH = 110
+SPLIT_ROW_HEIGHT = 60
+
+def get_available_channel_layers(node):
+    """Get unique channel layers from the node's input."""
+    if not node.input(0):
+        return []
+    return V_layer_catalog.get_layers(node.input(0))
+
+def is_new_shuffle(node):
+    """Check if the node is a new-style Shuffle (Nuke 13+)."""
+    return 'in1' in node.knobs()
+
+def apply_shuffle_layers(shuffle_node, in_layer, out_layer, create_out=False):
+    """
+    Set the input and output layer of an old or new Shuffle in one undo step.
+
+    Args:
+        shuffle_node: Shuffle or Shuffle2 node
+        in_layer (str): Layer for 'in' / 'in1'
+        out_layer (str): Layer for 'out' / 'out1'
+        create_out (bool): Create out_layer with RGBA channels if it does not exist
+
+    Returns:
+        bool: True if out_layer was created
+    """
+    if shuffle_node.Class() not in SHUFFLE_LAYER_KNOBS:
+        raise ValueError(f"{shuffle_node.name()} is not a Shuffle node")
+    is_new = is_new_shuffle(shuffle_node)
+    created = False
+    with BatchEdit("Shuffle channels") as batch:
+        # Set the input knob based on node type
+        batch.set(shuffle_node, 'in1' if is_new else 'in', in_layer)
+        if create_out:
+            created = bool(V_layer_catalog.create_layers([out_layer])["created"])
+        # Set the output knob based on node type
+        batch.set(shuffle_node, 'out1' if is_new else 'out', out_layer)
+        # Update UI
+        batch.update_ui()
+    return created
+
+def _create_shuffle(source):
+    """Create a Shuffle2 wired to source, falling back to Shuffle on older Nuke."""
+    try:
+        return nuke.nodes.Shuffle2(inputs=[source])
+    except RuntimeError:
+        return nuke.nodes.Shuffle(inputs=[source])
+
+def split_all_layers(source, layer_filter=None, columns=SPLIT_COLUMNS):
+    """
+    Create one Shuffle per layer of source, laid out in a grid below it.
+
+    Args:
+        source: Node to split. If it is a Shuffle, its input is split instead.
+        layer_filter (str): Optional comma separated glob patterns, e.g. "light_*, spec*"
+        columns (int): Number of Shuffles per grid row
+
+    Returns:
+        list: The created Shuffle nodes
+    """
+    if source.Class() in ["Shuffle", "Shuffle2"]:
+        layers = get_available_channel_layers(source)
+        source = source.input(0)
+    else:
+        layers = V_layer_catalog.get_layers(source)
+
+    if layer_filter and layer_filter.strip():
+        patterns = [p.strip() for p in layer_filter.split(',') if p.strip()]
+        layers = [layer for layer in layers if any(fnmatch(layer, p) for p in patterns)]
+    if not layers:
+        return []
+
+    # nuke.nodes.* skips createNode's auto-placement and panel handling, and one
+    # batch with a single updateUI keeps the cost per layer constant
+    shuffles = []
+    x, y = source.xpos(), source.ypos()
+    with BatchEdit("Split all layers") as batch:
+        for i, layer in enumerate(layers):
+            shuffle = _create_shuffle(source)
+            if i == 0:
+                is_new = is_new_shuffle(shuffle)
+            batch.set_many(shuffle, {'in1' if is_new else 'in': layer,
+                                     'out1' if is_new else 'out': 'rgba',
+                                     'label': layer})
+            row, col = divmod(i, columns)
+            shuffle.setXYpos(x + col * SPLIT_COLUMN_WIDTH, y + (row + 1) * SPLIT_ROW_HEIGHT)
+            shuffles.append(shuffle)
+        batch.update_ui()
+    return shuffles
+
+class LayerRemapper(object):
+    """
+    Resolves old layer names to new ones.
+
+    Exact names in mapping win, otherwise the first regex rule that matches is
+    applied with re.sub. Results are memoized, since a script usually has
+    thousands of Shuffles but only a few dozen distinct layer names.
+    """
+
+    def __init__(self, mapping=None, rules=None):
+        self.mapping = dict(mapping or {})
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in (rules or [])]
+        self._memo = {}
+
+    def remap(self, layer):
+        """Returns the new name for layer, or None if it is left alone."""
+        if layer in self._memo:
+            return self._memo[layer]
+        new_layer = self.mapping.get(layer)
+        if new_layer is None:
+            for pattern, replacement in self.rules:
+                candidate, count = pattern.subn(replacement, layer)
+                if count:
+                    new_layer = candidate
+                    break
+        if new_layer == layer:
+            new_layer = None
+        self._memo[layer] = new_layer
+        return new_layer
+
+def remap_shuffle_layers(mapping=None, rules=None, dry_run=False, nodes=None):
+    """
+    Rewrite the layers of every Shuffle and Shuffle2 in the script.
+
+    Args:
+        mapping (dict): Exact renames, e.g. {"diffuse_direct": "diff_dir"}
+        rules (list): (regex, replacement) pairs tried in order when mapping has no entry
+        dry_run (bool): Only report, change nothing
+        nodes (list): Nodes to consider, defaults to the whole script including groups
+
+    Returns:
+        dict: "changes" as (node, knob name, old layer, new layer) tuples and
+              "created_layers" as the layers that were (or would be) created
+    """
+    remapper = LayerRemapper(mapping, rules)
+    if nodes is None:
+        nodes = nuke.allNodes(recurseGroups=True)
+
+    # One traversal collects every knob to rewrite
+    changes = []
+    for node in nodes:
+        knob_names = SHUFFLE_LAYER_KNOBS.get(node.Class())
+        if not knob_names:
+            continue
+        for knob_name in knob_names:
+            knob = node.knob(knob_name)
+            if knob is None or knob.value() == "none":
+                continue
+            new_layer = remapper.remap(knob.value())
+            if new_layer:
+                changes.append((node, knob_name, knob.value(), new_layer))
+
+    # Missing target layers are created in one batch before any knob is set
+    new_layers = list(dict.fromkeys(change[3] for change in changes))
+    created_layers = V_layer_catalog.ensure_layers(new_layers, dry_run=dry_run)
+
+    if not dry_run and changes:
+        with BatchEdit("Remap Shuffle layers") as batch:
+            for node, knob_name, _, new_layer in changes:
+                batch.set(node, knob_name, new_layer)
+            batch.update_ui()
+    return {"changes": changes, "created_layers": created_layers}
+
+def format_remap_report(result, limit=50):
+    """Turn the result of remap_shuffle_layers into readable text."""
+    changes = result["changes"]
+    lines = [f"{len(changes)} knob(s) on {len(set(c[0].fullName() for c in changes))} Shuffle node(s)"]
+    for node, knob_name, old_layer, new_layer in changes[:limit]:
+        lines.append(f"  {node.fullName()}.{knob_name}: {old_layer} -> {new_layer}")
+    if len(changes) > limit:
+        lines.append(f"  ... and {len(changes) - limit} more")
+    if result["created_layers"]:
+        lines.append("New layers: " + ", ".join(result["created_layers"]))
+    return "\n".join(lines)
+
+def parse_remap_text(text):
+    """
+    Parse "old=new, re:pattern=replacement" into a mapping and a list of rules.
+    """
+    mapping, rules = {}, []
+    for entry in text.split(','):
+        if '=' not in entry:
+            continue
+        old, new = [part.strip() for part in entry.split('=', 1)]
+        if old.startswith("re:"):
+            rules.append((old[3:], new))
+        elif old:
+            mapping[old] = new
+    return mapping, rules
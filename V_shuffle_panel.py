@@ -0,0 +1,298 @@
+"""Dockable Shuffle panel that follows the node selection.
+
+Open it from V_commands -> Shuffle Panel, or from the Pane menu of any panel.
+Selecting a Shuffle or Shuffle2 shows the layers of its input. Clicking a layer
+sets 'in'/'in1', and the output dropdown sets 'out'/'out1', each as one undo
+step. The panel stays open while you move from Shuffle to Shuffle.
+
+Selection changes reach the panel through a knobChanged callback that Nuke
+only runs for Shuffle classes, and only while a panel is shown, so closed
+panels cost nothing. A single-shot timer then throttles them, so
+dragging a selection over many Shuffles costs one update. Layers come from
+V_layer_catalog, so Shuffles under the same upstream share one channel scan.
+The lists are only replaced when the layers differ from those already shown.
+"""
+import threading
+import weakref
+import nuke
+from PySide2 import QtWidgets, QtCore
+import V_layer_catalog
+import V_commands
+from V_batch_edit import BatchEdit, set_knob
+from V_shuffle_dropdown import discover_layers_async
+from V_shuffle_ops import SHUFFLE_LAYER_KNOBS, apply_shuffle_layers, is_new_shuffle
+
+# Its entry in V_commands.PANELS registers it under this id
+PANEL_ID = "V_tools.ShufflePanel"
+
+# At most one selection-driven update per interval, in milliseconds
+FOLLOW_INTERVAL_MS = 50
+
+# Knobs of the shown Shuffle that the panel mirrors when they change elsewhere
+_WATCHED_KNOBS = {"inputChange"} | set(k for knobs in SHUFFLE_LAYER_KNOBS.values() for k in knobs)
+
+# Panels currently shown, dropped automatically once Qt deletes them
+_panels = weakref.WeakSet()
+_callbacks_registered = False
+
+def _node_alive(node):
+    try:
+        node.name()
+        return True
+    except (ValueError, AttributeError):
+        return False  # Deleted since it was shown
+
+def _on_knob_changed():
+    knob = nuke.thisKnob()
+    if knob is None or not _panels:
+        return
+    node = nuke.thisNode()
+    if knob.name() == "selected":
+        if knob.value():
+            for panel in list(_panels):
+                panel.follow(node)
+    elif knob.name() in _WATCHED_KNOBS:
+        for panel in list(_panels):
+            panel.node_changed(node)
+
+def _update_callbacks():
+    """Installs the knobChanged callback while a panel is shown, and removes it after."""
+    global _callbacks_registered
+    wanted = bool(_panels)
+    if wanted == _callbacks_registered:
+        return
+    # Limited to Shuffle classes, so selecting other nodes never runs Python
+    for node_class in SHUFFLE_LAYER_KNOBS:
+        if wanted:
+            nuke.addKnobChanged(_on_knob_changed, nodeClass=node_class)
+        else:
+            nuke.removeKnobChanged(_on_knob_changed, nodeClass=node_class)
+    _callbacks_registered = wanted
+
+def _selected_shuffle():
+    try:
+        node = nuke.selectedNode()
+    except ValueError:
+        return None
+    return node if node.Class() in SHUFFLE_LAYER_KNOBS else None
+
+class ShufflePanel(QtWidgets.QWidget):
+    """Layer picker for the selected Shuffle, built once and updated in place."""
+
+    def __init__(self, parent=None):
+        super(ShufflePanel, self).__init__(parent)
+        self.node = None
+        self.in_knob = None
+        self.out_knob = None
+        self._pending = None
+        self._layer_index = None  # LayerNameIndex of the layers shown
+        self._shown_in = []       # Input layers currently listed, after filtering
+        self._out_layers = []     # Output dropdown entries
+        self._cancel_event = None
+
+        # Throttles selection changes: the last node picked in an interval wins
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(FOLLOW_INTERVAL_MS)
+        self._timer.timeout.connect(self._apply_pending)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.title_label = QtWidgets.QLabel("Select a Shuffle node")
+        layout.addWidget(self.title_label)
+        self.status_label = QtWidgets.QLabel("")
+        self.status_label.hide()
+        layout.addWidget(self.status_label)
+
+        # Type-ahead filter backed by the catalog's prefix/substring index
+        self.filter_input = QtWidgets.QLineEdit()
+        self.filter_input.setPlaceholderText("Filter layers...")
+        self.filter_input.textChanged.connect(self.apply_filter)
+        self.filter_input.returnPressed.connect(self.pick_current_input)
+        layout.addWidget(self.filter_input)
+
+        # Models stay put and only get new string lists, the views never rebuild
+        self.in_model = QtCore.QStringListModel()
+        self.in_view = QtWidgets.QListView()
+        self.in_view.setModel(self.in_model)
+        self.in_view.setUniformItemSizes(True)
+        self.in_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.in_view.clicked.connect(self.pick_input)
+        layout.addWidget(self.in_view)
+
+        layout.addWidget(QtWidgets.QLabel("Output:"))
+        self.out_model = QtCore.QStringListModel()
+        self.out_combo = QtWidgets.QComboBox()
+        self.out_combo.setModel(self.out_model)
+        self.out_combo.activated.connect(self.pick_output)
+        layout.addWidget(self.out_combo)
+
+        self.new_layer_input = QtWidgets.QLineEdit()
+        self.new_layer_input.setPlaceholderText("New output layer, Enter to create...")
+        self.new_layer_input.returnPressed.connect(self.create_output_layer)
+        layout.addWidget(self.new_layer_input)
+
+        self._set_enabled(False)
+
+        # Start with the Shuffle that is already selected, if any
+        node = _selected_shuffle()
+        if node is not None:
+            self.set_node(node)
+
+    def _set_enabled(self, enabled):
+        for widget in (self.filter_input, self.in_view, self.out_combo, self.new_layer_input):
+            widget.setEnabled(enabled)
+
+    def _set_status(self, text):
+        self.status_label.setText(text)
+        self.status_label.setVisible(bool(text))
+
+    def follow(self, node):
+        """Shows node once the current throttle interval ends."""
+        self._pending = node
+        if self.isVisible() and not self._timer.isActive():
+            self._timer.start()
+
+    def node_changed(self, node):
+        """Re-reads the shown Shuffle after its input or layer knobs changed."""
+        if self.node is not None and _node_alive(self.node) and node.fullName() == self.node.fullName():
+            self.follow(self._pending or node)
+
+    def showEvent(self, event):
+        _panels.add(self)
+        _update_callbacks()
+        # Selection changes made while the panel was hidden were not seen
+        self._pending = self._pending or _selected_shuffle()
+        if self._pending is not None:
+            self._apply_pending()
+        super(ShufflePanel, self).showEvent(event)
+
+    def hideEvent(self, event):
+        _panels.discard(self)
+        _update_callbacks()
+        self._cancel_discovery()
+        super(ShufflePanel, self).hideEvent(event)
+
+    def _apply_pending(self):
+        node, self._pending = self._pending, None
+        if node is not None and _node_alive(node):
+            self.set_node(node)
+
+    def _cancel_discovery(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self._cancel_event = None
+
+    def set_node(self, node):
+        """Points the panel at a Shuffle, touching only the parts that changed."""
+        self._cancel_discovery()
+        self.node = node
+        is_new = is_new_shuffle(node)
+        self.in_knob = 'in1' if is_new else 'in'
+        self.out_knob = 'out1' if is_new else 'out'
+        source = node.input(0)
+        self.title_label.setText(f"{node.Class()}: {node.name()}" + (f"  <-  {source.name()}" if source else ""))
+
+        if source is None:
+            self._set_status("No input connected.")
+            self._show_layers(V_layer_catalog.LayerNameIndex([]))
+            return
+        layers = V_layer_catalog.peek_layers(source)
+        if layers is not None:
+            # Cached and still valid for this upstream, so no channel scan
+            self._set_status("")
+            self._show_layers(V_layer_catalog.get_layer_index(source))
+            return
+
+        self._set_status("Loading layers...")
+        self._set_enabled(False)
+        self._cancel_event = threading.Event()
+        discover_layers_async(node, lambda found: self._layers_found(node, found), self._cancel_event)
+
+    def _layers_found(self, node, layers):
+        if node is not self.node:
+            return  # The selection moved on while discovery ran
+        self._cancel_event = None
+        self._set_status("" if layers else "No channels found.")
+        source = node.input(0)
+        # Discovery has just filled the catalog, so this only builds (and caches) the index
+        index = V_layer_catalog.get_layer_index(source) if layers and source else V_layer_catalog.LayerNameIndex([])
+        self._show_layers(index)
+
+    def _show_layers(self, index):
+        if self._layer_index is None or index.layers != self._layer_index.layers:
+            self._layer_index = index
+            self.apply_filter(self.filter_input.text())
+        self._set_enabled(bool(index.layers))
+        self.sync_current()
+
+    def apply_filter(self, text):
+        # Show only the layers matching the typed text, keeping priority order
+        self._shown_in = self._layer_index.search(text) if self._layer_index else []
+        self.in_model.setStringList(self._shown_in)
+        self._select_current_input()
+
+    def _select_current_input(self):
+        current = self.node[self.in_knob].value() if self.node is not None and _node_alive(self.node) else None
+        if current in self._shown_in:
+            self.in_view.setCurrentIndex(self.in_model.index(self._shown_in.index(current)))
+        elif self._shown_in:
+            self.in_view.setCurrentIndex(self.in_model.index(0))
+
+    def sync_current(self):
+        """Highlights the Shuffle's current layers, replacing the output list only if it changed."""
+        if self.node is None or not _node_alive(self.node):
+            return
+        self._select_current_input()
+        layers = self._layer_index.layers if self._layer_index else []
+        current_out = self.node[self.out_knob].value()
+        # A custom output layer is listed on top, as in the Shuffle dropdown
+        out_layers = layers if not current_out or current_out in layers else [current_out] + layers
+        if out_layers != self._out_layers:
+            self._out_layers = list(out_layers)
+            self.out_model.setStringList(self._out_layers)
+        if current_out in self._out_layers:
+            self.out_combo.blockSignals(True)
+            self.out_combo.setCurrentIndex(self._out_layers.index(current_out))
+            self.out_combo.blockSignals(False)
+
+    def _write(self, knob_name, layer):
+        if self.node is None or not _node_alive(self.node):
+            self.node = None
+            self.title_label.setText("Select a Shuffle node")
+            self._set_enabled(False)
+            return
+        with BatchEdit("Shuffle Panel"):
+            set_knob(self.node, knob_name, layer)
+
+    def pick_input(self, index):
+        self._write(self.in_knob, self.in_model.data(index, QtCore.Qt.DisplayRole))
+
+    def pick_current_input(self):
+        # Enter in the filter picks the highlighted (or first) match
+        index = self.in_view.currentIndex()
+        if not index.isValid() and self.in_model.rowCount():
+            index = self.in_model.index(0)
+        if index.isValid():
+            self.pick_input(index)
+
+    def pick_output(self, row):
+        if 0 <= row < len(self._out_layers):
+            self._write(self.out_knob, self._out_layers[row])
+
+    def create_output_layer(self):
+        """Creates the typed layer if needed and makes it the output."""
+        name = self.new_layer_input.text().strip()
+        if not name or self.node is None or not _node_alive(self.node):
+            return
+        apply_shuffle_layers(self.node, self.node[self.in_knob].value(), name, create_out=True)
+        self.new_layer_input.clear()
+        self.sync_current()
+
+def show_panel():
+    """Shows the open Shuffle panel, or docks a new one next to the Properties bin."""
+    for panel in list(_panels):
+        if panel.isVisible():
+            panel.raise_()
+            return panel
+    return V_commands.show_panel(PANEL_ID)
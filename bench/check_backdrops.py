@@ -0,0 +1,80 @@
+"""Check headless that auto backdrops keep clear of the backdrops already in a script.
+
+Usage:
+    python bench/check_backdrops.py
+
+Runs against the stand-in nuke module. Each case builds a small script, runs
+V_backdrop_ops.create_auto_backdrops and checks where the new backdrops went
+and how their z_orders nest.
+Exits with 1 if any case fails.
+"""
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+
+import fake_nuke
+fake_nuke.install()
+
+import nuke
+import V_backdrop_ops
+from V_backdrop_ops import backdrop_rect
+from V_geometry import rects_overlap, rect_contains
+
+def _backdrop(rect):
+    return nuke.nodes.BackdropNode(xpos=rect[0], ypos=rect[1], bdwidth=rect[2] - rect[0],
+                                   bdheight=rect[3] - rect[1], z_order=V_backdrop_ops.Z_ORDER_BASE)
+
+def _grades(positions):
+    return [nuke.nodes.Grade(xpos=x, ypos=y) for x, y in positions]
+
+def _partial_overlaps(new, old):
+    return [(backdrop_rect(a), backdrop_rect(b)) for a in new for b in old
+            if rects_overlap(backdrop_rect(a), backdrop_rect(b))
+            and not rect_contains(backdrop_rect(a), backdrop_rect(b))]
+
+def check_trims_next_to_existing():
+    """Free nodes right of a backdrop get one whose padding stops at its edge."""
+    old = _backdrop((-100, -100, 180, 178))
+    _grades([(0, 0)])
+    _grades([(260, 0), (260, 60)])
+    new = V_backdrop_ops.create_auto_backdrops(min_nodes=2)
+    assert len(new) == 1, f"expected 1 backdrop, got {len(new)}"
+    assert backdrop_rect(new[0])[0] == 180, f"not trimmed to the existing edge: {backdrop_rect(new[0])}"
+    assert not _partial_overlaps(new, [old]), _partial_overlaps(new, [old])
+
+def check_encloses_existing():
+    """A cluster around a backdrop wraps it and is drawn behind it."""
+    old = _backdrop((200, 200, 300, 300))
+    _grades([(100, 150), (400, 150), (100, 350), (400, 350)])
+    new = V_backdrop_ops.create_auto_backdrops(gap=300, min_nodes=2)
+    assert len(new) == 1, f"expected 1 backdrop, got {len(new)}"
+    assert rect_contains(backdrop_rect(new[0]), backdrop_rect(old)), backdrop_rect(new[0])
+    assert new[0]["z_order"].value() == V_backdrop_ops.Z_ORDER_BASE
+    assert old["z_order"].value() == V_backdrop_ops.Z_ORDER_BASE + 1, old["z_order"].value()
+
+def check_drops_when_nodes_reach_in():
+    """Nodes that stick into a backdrop too big to enclose, without their centre on it, get no backdrop."""
+    _backdrop((0, 0, 400, 400))
+    _grades([(60, -10), (160, -10)])
+    new = V_backdrop_ops.create_auto_backdrops(min_nodes=2)
+    assert not new, [backdrop_rect(b) for b in new]
+
+CHECKS = (check_trims_next_to_existing, check_encloses_existing, check_drops_when_nodes_reach_in)
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        nuke.clear()
+        try:
+            check()
+        except AssertionError as e:
+            failures += 1
+            print(f"FAIL {check.__name__}: {e}")
+        else:
+            print(f"ok   {check.__name__}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,487 @@
+"""In-process stand-in for the parts of the nuke module the V tools use.
+
+Models nodes, knobs, channels, layers, selection, callbacks and undo groups
+closely enough to run the tools headless and time them. Every call that would
+go through Nuke's Python bindings for a graph query bumps STATS["calls"], so
+benchmarks can compare API traffic as well as wall time.
+
+Call install() before importing a tool so that "import nuke" finds this module.
+"""
+import sys
+
+GUI = False
+STARTLINE = 0x1000
+INPUTS = 1
+HIDDEN_INPUTS = 2
+EXPRESSIONS = 4
+
+_DEFAULT_LAYERS = ["rgb", "rgba", "alpha", "depth", "motion", "forward", "backward", "mask"]
+_ZERO_INPUT = {"Read", "Constant", "BackdropNode", "CheckerBoard2", "StickyNote"}
+
+# Counters read by the benchmarks: "calls" (graph queries) and "updateUI"
+STATS = {"calls": 0}
+
+class Knob(object):
+    def __init__(self, name, label=None, value=""):
+        self._name = name
+        self._label = label
+        self._value = value
+        self._flags = 0
+        self.node = None
+
+    def name(self):
+        return self._name
+
+    def label(self):
+        return self._label or self._name
+
+    def value(self):
+        return self._value
+
+    getValue = value
+
+    def setValue(self, value):
+        self._value = value
+        if self.node is not None:
+            self.node._knob_set(self)
+        return True
+
+    def setFlag(self, flag):
+        self._flags |= flag
+
+    def clearFlag(self, flag):
+        self._flags &= ~flag
+
+class NameKnob(Knob):
+    """The node name, kept unique across the script like Nuke does."""
+
+    def setValue(self, value):
+        node = self.node
+        old = self._value
+        if old == value:
+            return True
+        if value in _root._names:
+            raise ValueError(f"{value} already exists")
+        _root._names.pop(old, None)
+        _root._names[value] = node
+        self._value = value
+        node._knob_set(self)
+        return True
+
+class EvalString_Knob(Knob):
+    pass
+
+class PyScript_Knob(Knob):
+    pass
+
+class Text_Knob(Knob):
+    pass
+
+class Int_Knob(Knob):
+    pass
+
+class Tab_Knob(Knob):
+    pass
+
+class Channel_Knob(Knob):
+    pass
+
+class ChannelMask_Knob(Channel_Knob):
+    pass
+
+# Extra knobs per node class, with their default values and, for channel knobs, their type
+_CLASS_KNOBS = {
+    "BackdropNode": (("bdwidth", 100), ("bdheight", 100), ("z_order", 0),
+                     ("note_font_size", 20), ("note_font_color", 0)),
+    "Shuffle": (("in", "rgba", Channel_Knob), ("in2", "none", Channel_Knob),
+                ("out", "rgba", Channel_Knob), ("out2", "none", Channel_Knob)),
+    "Shuffle2": (("in1", "rgba", Channel_Knob), ("in2", "none", Channel_Knob),
+                 ("out1", "rgba", Channel_Knob), ("out2", "none", Channel_Knob)),
+    "Read": (("file", ""), ("first", 1), ("last", 1)),
+    "Write": (("file", ""), ("channels", "rgba", ChannelMask_Knob)),
+    "Remove": (("operation", "remove"), ("channels", "none", ChannelMask_Knob),
+               ("channels2", "none", ChannelMask_Knob), ("channels3", "none", ChannelMask_Knob),
+               ("channels4", "none", ChannelMask_Knob)),
+    "Grade": (("channels", "rgba", ChannelMask_Knob), ("maskChannelInput", "none", Channel_Knob)),
+}
+
+class Node(object):
+    def __init__(self, node_class):
+        self._class = node_class
+        self._knobs = {}
+        self._inputs = []
+        self._channels = []
+        self._deleted = False
+        for name, value in (("name", ""), ("xpos", 0), ("ypos", 0), ("label", ""), ("tile_color", 0),
+                            ("note_font", ""), ("selected", False)):
+            self._add(NameKnob(name) if name == "name" else Knob(name, value=value))
+        for name, value, *knob_type in _CLASS_KNOBS.get(node_class, ()):
+            self._add((knob_type[0] if knob_type else Knob)(name, value=value))
+
+    def _add(self, knob):
+        knob.node = self
+        self._knobs[knob.name()] = knob
+
+    def _check(self):
+        if self._deleted:
+            raise ValueError("PythonObject not attached to a node")
+
+    def _knob_set(self, knob):
+        _fire_knob_changed(self, knob)
+
+    def Class(self):
+        return self._class
+
+    def name(self):
+        self._check()
+        return self._knobs["name"].value()
+
+    def fullName(self):
+        return self.name()
+
+    def knob(self, name):
+        self._check()
+        return self._knobs.get(name)
+
+    def knobs(self):
+        self._check()
+        return dict(self._knobs)
+
+    def __getitem__(self, name):
+        self._check()
+        try:
+            return self._knobs[name]
+        except KeyError:
+            raise NameError(name)
+
+    def addKnob(self, knob):
+        self._add(knob)
+
+    def xpos(self):
+        STATS["calls"] += 1
+        return int(self._knobs["xpos"].value())
+
+    def ypos(self):
+        STATS["calls"] += 1
+        return int(self._knobs["ypos"].value())
+
+    def setXpos(self, x):
+        self._knobs["xpos"]._value = x
+
+    def setYpos(self, y):
+        self._knobs["ypos"]._value = y
+
+    def setXYpos(self, x, y):
+        self.setXpos(x)
+        self.setYpos(y)
+
+    def screenWidth(self):
+        STATS["calls"] += 1
+        if self._class == "BackdropNode":
+            return int(self._knobs["bdwidth"].value())
+        return 80
+
+    def screenHeight(self):
+        STATS["calls"] += 1
+        if self._class == "BackdropNode":
+            return int(self._knobs["bdheight"].value())
+        return 18
+
+    def input(self, i):
+        return self._inputs[i] if i < len(self._inputs) else None
+
+    def inputs(self):
+        return len(self._inputs)
+
+    def maxInputs(self):
+        return 0 if self._class in _ZERO_INPUT else 2
+
+    def setInput(self, i, node):
+        while len(self._inputs) <= i:
+            self._inputs.append(None)
+        self._inputs[i] = node
+        _fire_knob_changed(self, Knob("inputChange"))
+        return True
+
+    def dependent(self, what=INPUTS, forceEvaluate=True):
+        STATS["calls"] += 1
+        return [n for n in _root._nodes if self in n._inputs]
+
+    def channels(self):
+        """Own channels plus everything upstream, plus a Shuffle's output layer."""
+        STATS["calls"] += 1
+        chans = list(self._channels)
+        for inp in self._inputs:
+            if inp is not None:
+                chans.extend(inp.channels())
+        if self._class in ("Shuffle", "Shuffle2"):
+            out = self._knobs["out1" if self._class == "Shuffle2" else "out"].value()
+            if out and out != "none":
+                chans.extend(_layer_channels(out))
+        return list(dict.fromkeys(chans))
+
+    def parent(self):
+        return _root
+
+    def setSelected(self, selected):
+        self._knobs["selected"]._value = selected
+
+    def isSelected(self):
+        return self._knobs["selected"].value()
+
+    def __repr__(self):
+        return f"<Node {self._class} {self._knobs['name'].value()}>"
+
+class _Root(object):
+    def __init__(self):
+        self._nodes = []
+        self._names = {}
+
+    def name(self):
+        return "fake.nk"
+
+    def fullName(self):
+        return "root"
+
+    def Class(self):
+        return "Root"
+
+class Undo(object):
+    """Records begin/end pairs in Undo.log instead of building undo history."""
+    log = []
+
+    def __init__(self, *args):
+        pass
+
+    def begin(self, name=""):
+        Undo.log.append(("begin", name))
+
+    def end(self):
+        Undo.log.append(("end",))
+
+    def cancel(self):
+        Undo.log.append(("cancel",))
+
+    @staticmethod
+    def disable():
+        pass
+
+    @staticmethod
+    def enable():
+        pass
+
+class Menu(object):
+    def __init__(self, name):
+        self._name = name
+        self.items = []
+
+    def name(self):
+        return self._name
+
+    def addMenu(self, name):
+        sub = Menu(name)
+        self.items.append(sub)
+        return sub
+
+    def addCommand(self, name, command="", shortcut=""):
+        self.items.append((name, command, shortcut))
+
+_root = _Root()
+_layers = {}
+_callbacks = {"create": [], "destroy": [], "knob": [], "load": [], "close": []}
+_this = []
+_counters = {}
+_menus = {}
+_answers = []
+
+# Every nuke.message text, in order
+messages = []
+
+def _layer_channels(layer):
+    if layer in _layers:
+        return list(_layers[layer])
+    if layer == "rgba":
+        return ["rgba.red", "rgba.green", "rgba.blue", "rgba.alpha"]
+    return [f"{layer}.red", f"{layer}.green", f"{layer}.blue"]
+
+def _fire(kind, node, knob=None):
+    for func, args, kwargs, node_class in list(_callbacks[kind]):
+        if node_class and node is not None and node.Class() != node_class:
+            continue
+        _this.append((node, knob))
+        try:
+            func(*args, **kwargs)
+        finally:
+            _this.pop()
+
+def _fire_knob_changed(node, knob):
+    if node.knob("name") is None or not node.name():
+        return
+    _fire("knob", node, knob)
+
+def _unique(base):
+    i = _counters.get(base, 1)
+    while f"{base}{i}" in _root._names:
+        i += 1
+    _counters[base] = i + 1
+    return f"{base}{i}"
+
+def _create(node_class, **knobs):
+    node = Node(node_class)
+    name = knobs.pop("name", None) or _unique(node_class)
+    if name in _root._names:
+        name = _unique(name)
+    node._knobs["name"]._value = name
+    _root._names[name] = node
+    _root._nodes.append(node)
+    for key, value in knobs.items():
+        if key == "inputs":
+            for i, inp in enumerate(value):
+                node.setInput(i, inp)
+        elif node.knob(key) is not None:
+            node.knob(key)._value = value
+    _fire("create", node)
+    return node
+
+def thisNode():
+    return _this[-1][0] if _this else _root
+
+def thisKnob():
+    return _this[-1][1] if _this else None
+
+def thisGroup():
+    return _root
+
+def root():
+    return _root
+
+def createNode(node_class, knobs="", inpanel=True):
+    """Like nuke.createNode: the new node becomes the only selected one."""
+    selected = selectedNodes()
+    node = _create(node_class)
+    for n in selected:
+        n.setSelected(False)
+    node.setSelected(True)
+    return node
+
+class _Nodes(object):
+    def __getattr__(self, node_class):
+        return lambda **knobs: _create(node_class, **knobs)
+
+nodes = _Nodes()
+
+def delete(node):
+    _fire("destroy", node)
+    _root._nodes.remove(node)
+    _root._names.pop(node.name(), None)
+    for n in _root._nodes:
+        n._inputs = [None if i is node else i for i in n._inputs]
+    node._deleted = True
+
+def allNodes(filter=None, group=None, recurseGroups=False):
+    STATS["calls"] += 1
+    if filter:
+        return [n for n in _root._nodes if n._class == filter]
+    return list(_root._nodes)
+
+def toNode(name):
+    STATS["calls"] += 1
+    return _root._names.get(name)
+
+def exists(name):
+    STATS["calls"] += 1
+    return name in _root._names
+
+def selectedNodes(filter=None):
+    STATS["calls"] += 1
+    return [n for n in _root._nodes if n.isSelected() and (not filter or n._class == filter)]
+
+def selectedNode():
+    selected = selectedNodes()
+    if not selected:
+        raise ValueError("no node selected")
+    return selected[-1]
+
+def channels(node=None):
+    return node.channels() if node is not None else []
+
+def layers(node=None):
+    STATS["calls"] += 1
+    return list(dict.fromkeys(_DEFAULT_LAYERS + list(_layers)))
+
+def Layer(name, chans):
+    _layers[name] = list(chans)
+
+def updateUI():
+    STATS["updateUI"] = STATS.get("updateUI", 0) + 1
+
+def message(text):
+    messages.append(text)
+
+def ask(text):
+    return bool(_answers.pop(0)) if _answers else True
+
+def getInput(text, default=""):
+    return _answers.pop(0) if _answers else default
+
+def getFilename(message, pattern=None, default=None, favorites=None, type=None, multiple=False):
+    return _answers.pop(0) if _answers else None
+
+def answer(*values):
+    """Queues the replies the next nuke.ask/nuke.getInput/nuke.getFilename calls return."""
+    _answers.extend(values)
+
+def zoom(*args):
+    pass
+
+def executeInMainThread(func, args=(), kwargs=None):
+    func(*args, **(kwargs or {}))
+
+def executeInMainThreadWithResult(func, args=(), kwargs=None):
+    return func(*args, **(kwargs or {}))
+
+def menu(name):
+    return _menus.setdefault(name, Menu(name))
+
+def _adder(kind):
+    def add(func, args=(), kwargs=None, nodeClass="*"):
+        _callbacks[kind].append((func, args, kwargs or {}, None if nodeClass == "*" else nodeClass))
+
+    def remove(func, args=(), kwargs=None, nodeClass="*"):
+        _callbacks[kind][:] = [c for c in _callbacks[kind] if c[0] is not func]
+    return add, remove
+
+addOnCreate, removeOnCreate = _adder("create")
+addOnDestroy, removeOnDestroy = _adder("destroy")
+addKnobChanged, removeKnobChanged = _adder("knob")
+addOnScriptLoad, removeOnScriptLoad = _adder("load")
+addOnScriptClose, removeOnScriptClose = _adder("close")
+
+def set_channels(node, chans):
+    """Gives node its own channels, as a Read of a multi-layer EXR would have."""
+    node._channels = list(chans)
+
+def load_script():
+    """Fires the onScriptLoad callbacks, as opening a script would."""
+    _fire("load", None)
+
+def clear():
+    """Closes the script and starts an empty one, keeping the tools' callbacks."""
+    _fire("close", None)
+    _root._nodes[:] = []
+    _root._names.clear()
+    _layers.clear()
+    _counters.clear()
+    del messages[:]
+    del _answers[:]
+    del Undo.log[:]
+    reset_stats()
+
+def reset_stats():
+    STATS.clear()
+    STATS["calls"] = 0
+
+def install():
+    """Makes "import nuke" return this module."""
+    sys.modules["nuke"] = sys.modules[__name__]
+    return sys.modules[__name__]
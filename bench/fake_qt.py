@@ -0,0 +1,59 @@
+"""Inert PySide2 stand-in so the tools' dialogs can be built headless.
+
+Every Qt class is a no-op object: calls return further no-op objects, which
+are falsy, so text fields read as empty and dialogs return at once from exec_.
+Only the logic around the widgets runs, which is what the benchmarks time.
+"""
+import sys
+import types
+
+class _InertType(type):
+    # Class attributes such as enums (QAbstractItemView.NoEditTriggers)
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Inert()
+
+class _Inert(object, metaclass=_InertType):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return _Inert()
+
+    def __call__(self, *args, **kwargs):
+        return _Inert()
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return False
+
+    def __or__(self, other):
+        return self
+
+class _QtModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        cls = type(name, (_Inert,), {})
+        setattr(self, name, cls)
+        return cls
+
+def install():
+    """Registers PySide2, its QtWidgets/QtCore/QtGui submodules and shiboken2."""
+    package = types.ModuleType("PySide2")
+    for name in ("QtWidgets", "QtCore", "QtGui"):
+        module = _QtModule(f"PySide2.{name}")
+        setattr(package, name, module)
+        sys.modules[module.__name__] = module
+    sys.modules["PySide2"] = package
+    # Inert widgets are never deleted by Qt, so every one is still valid
+    shiboken = types.ModuleType("shiboken2")
+    shiboken.isValid = lambda obj: obj is not None
+    sys.modules["shiboken2"] = shiboken
+    return package
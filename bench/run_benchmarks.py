@@ -0,0 +1,282 @@
+"""Time the V tools headless against synthetic scripts and flag regressions.
+
+Usage:
+    python bench/run_benchmarks.py                  # run and compare to baseline.json
+    python bench/run_benchmarks.py --save-baseline  # run and store the results as the baseline
+    python bench/run_benchmarks.py -k backdrop      # only cases whose name contains "backdrop"
+
+Each case is rebuilt before every repeat, so only the tool call itself is
+timed. A case regresses when it makes more nuke API calls than the baseline
+did. Call counts are exact on any machine, so they decide by default. Timings
+are reported as the median of the repeats. With --check-time a case also
+regresses when its median grows past --threshold times the baseline and by more
+than --min-delta seconds. Store that baseline on the machine you compare on.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+
+import fake_nuke
+import fake_qt
+fake_nuke.install()
+fake_qt.install()
+
+import nuke
+import synthetic
+import Tag_input
+import V_layer_catalog
+import Shuffle_shift
+import V_shuffle_ops
+import V_backdrop_ops
+import V_backdrop_inator
+import V_shuffle_panel
+import V_channel_analyzer
+import V_settings
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+LAYOUT_FILE = os.path.join(os.path.dirname(BENCH_DIR), "assets", "presets", "backdrop_layout_example.json")
+
+# Cached palettes go to a scratch file instead of the user's home
+V_settings.get_store("backdrop_palette", path=os.path.join(tempfile.mkdtemp(), "palette.json"))
+
+# name -> (sizes, setup), setup(size) builds the script and returns the call to time
+BENCHMARKS = {}
+
+def benchmark(name, sizes):
+    def register(setup):
+        BENCHMARKS[name] = (sizes, setup)
+        return setup
+    return register
+
+@benchmark("tag.generate_unique_name", [100, 500, 2000])
+def bench_generate_unique_name(tags):
+    synthetic.make_script(nodes=tags * 10, tags=tags, exr_layers=0)
+
+    def run():
+        # Name and create 100 tags, as tagging a selection does. The first
+        # pick also builds the name index with one pass over the script
+        for _ in range(100):
+            nuke.nodes.NoOp(name=Tag_input.generate_unique_name("Tag_input"))
+    return run
+
+@benchmark("tag.generate_unique_name.warm", [100, 500, 2000])
+def bench_generate_unique_name_warm(tags):
+    run = bench_generate_unique_name(tags)
+    Tag_input.generate_unique_name("Tag_input")  # Builds the name index up front
+    return run
+
+@benchmark("tag.create_tag_input_nodes", [50, 500])
+def bench_create_tag_input_nodes(count):
+    script = synthetic.make_script(nodes=5000, tags=0, exr_layers=0, branches=count)
+    return lambda: Tag_input.create_tag_input_nodes(script["tips"])
+
+@benchmark("shuffle_shift.get_channels", [50, 200, 1000])
+def bench_get_channels(layers):
+    script = synthetic.make_script(nodes=2000, tags=0, exr_layers=layers)
+    shuffle = script["shuffles"][0]
+    return lambda: Shuffle_shift.ChannelButtonPanel(shuffle).get_channels()
+
+@benchmark("dropdown.get_available_channel_layers", [50, 200, 1000])
+def bench_available_layers_cold(layers):
+    script = synthetic.make_script(nodes=2000, tags=0, exr_layers=layers)
+    return lambda: V_shuffle_ops.get_available_channel_layers(script["shuffles"][0])
+
+@benchmark("dropdown.get_available_channel_layers.warm", [50, 200, 1000])
+def bench_available_layers_warm(layers):
+    script = synthetic.make_script(nodes=2000, tags=0, exr_layers=layers)
+    V_shuffle_ops.get_available_channel_layers(script["shuffles"][0])
+    return lambda: V_shuffle_ops.get_available_channel_layers(script["shuffles"][0])
+
+@benchmark("backdrop.create_backdrop", [100, 1000, 10000])
+def bench_create_backdrop(nodes):
+    synthetic.make_script(nodes=nodes, tags=0, exr_layers=0)
+    synthetic.select(nuke.allNodes())
+    nuke.reset_stats()
+    return V_backdrop_inator.BackdropCreator().create_backdrop
+
+@benchmark("backdrop.create_backdrop_layout", [1000, 10000])
+def bench_create_backdrop_layout(nodes):
+    synthetic.make_script(nodes=nodes, tags=0, exr_layers=0)
+    V_backdrop_ops.get_palette(LAYOUT_FILE)  # Cached once per file version
+    nuke.reset_stats()
+    return lambda: V_backdrop_ops.create_backdrop_layout(LAYOUT_FILE)
+
+@benchmark("shuffle_shift.select_channel", [20, 200])
+def bench_select_channel(shuffles):
+    script = synthetic.make_script(nodes=shuffles * 5, tags=0, exr_layers=50, branches=shuffles)
+    panels = [Shuffle_shift.ChannelButtonPanel(s) for s in script["shuffles"]]
+    nuke.reset_stats()
+
+    def run():
+        for panel in panels:
+            panel.select_channel("diffuse_000")
+    return run
+
+@benchmark("dropdown.apply_shuffle_layers", [20, 200])
+def bench_apply_shuffle_layers(shuffles):
+    script = synthetic.make_script(nodes=shuffles * 5, tags=0, exr_layers=50, branches=shuffles)
+    nuke.reset_stats()
+
+    def run():
+        # As the batch runner's shuffle_layers does, one undo step per Shuffle
+        for shuffle in script["shuffles"]:
+            V_shuffle_ops.apply_shuffle_layers(shuffle, "diffuse_000", "rgba")
+    return run
+
+@benchmark("shuffle_panel.follow_selection", [20, 50])
+def bench_follow_selection(shuffles):
+    # Each Shuffle has its own upstream, within the catalog's cache size
+    script = synthetic.make_script(nodes=shuffles * 5, tags=0, exr_layers=200, branches=shuffles)
+    panel = V_shuffle_panel.ShufflePanel()
+    nuke.reset_stats()
+
+    def run():
+        # Step through every Shuffle with one open panel, as clicking them in the DAG does
+        for shuffle in script["shuffles"]:
+            panel.set_node(shuffle)
+    return run
+
+@benchmark("shuffle_panel.follow_selection.warm", [20, 50])
+def bench_follow_selection_warm(shuffles):
+    run = bench_follow_selection(shuffles)
+    run()  # Every upstream has been scanned once
+    nuke.reset_stats()
+    return run
+
+@benchmark("shuffle_panel.follow_selection.after_pick", [20, 50])
+def bench_follow_selection_after_pick(shuffles):
+    script = synthetic.make_script(nodes=shuffles * 5, tags=0, exr_layers=200, branches=shuffles)
+    panel = V_shuffle_panel.ShufflePanel()
+
+    def run():
+        for shuffle in script["shuffles"]:
+            panel.set_node(shuffle)
+    run()
+    # Pick an input and an output layer on every Shuffle, then step through them again
+    for shuffle in script["shuffles"]:
+        panel.set_node(shuffle)
+        panel.pick_current_input()
+        panel.pick_output(1)
+    nuke.reset_stats()
+    return run
+
+@benchmark("dropdown.split_all_layers", [50, 200, 1000])
+def bench_split_all_layers(layers):
+    script = synthetic.make_script(nodes=2000, tags=0, exr_layers=layers)
+    return lambda: V_shuffle_ops.split_all_layers(script["reads"][0])
+
+@benchmark("dropdown.remap_shuffle_layers", [100, 1000])
+def bench_remap_shuffle_layers(shuffles):
+    synthetic.make_script(nodes=shuffles * 4, tags=0, exr_layers=20, branches=shuffles)
+    return lambda: V_shuffle_ops.remap_shuffle_layers(rules=[(r"^(\w+)_0(\d+)$", r"\1_v\2")])
+
+@benchmark("channel_analyzer.analyze", [1000, 5000])
+def bench_analyze_channels(nodes):
+    script = synthetic.make_script(nodes=nodes, tags=0, exr_layers=200, branches=20)
+    for shuffle in script["shuffles"]:
+        nuke.nodes.Write(inputs=[shuffle])
+    nuke.reset_stats()
+    return V_channel_analyzer.analyze_channels
+
+def time_case(setup, size, repeat):
+    """Returns the median run's seconds and the nuke API calls of one run of the case."""
+    times, calls = [], 0
+    for _ in range(repeat):
+        V_layer_catalog.invalidate()
+        run = setup(size)
+        nuke.reset_stats()
+        # Like timeit, keep garbage collection of the setup out of the timing
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+        calls = nuke.STATS["calls"]
+    # The median shrugs off both a lucky run and one disturbed by other load
+    return statistics.median(times), calls
+
+def run_benchmarks(pattern=None, repeat=5):
+    results = {}
+    for name, (sizes, setup) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        for size in sizes:
+            seconds, calls = time_case(setup, size, repeat)
+            results[f"{name}[{size}]"] = {"seconds": seconds, "calls": calls}
+    nuke.clear()
+    return results
+
+def compare(results, baseline, check_time=False, threshold=2.0, min_delta=0.005):
+    """
+    Returns (case, reason) for every case that regressed against the baseline.
+
+    Only call counts are compared unless check_time is set, as timings from
+    one machine are too noisy to fail a run on.
+    """
+    regressions = []
+    for case, result in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        slower = result["seconds"] > base["seconds"] * threshold and result["seconds"] - base["seconds"] > min_delta
+        if check_time and slower:
+            regressions.append((case, f"{base['seconds'] * 1000:.2f} ms -> {result['seconds'] * 1000:.2f} ms"))
+        if result["calls"] > base["calls"]:
+            regressions.append((case, f"{base['calls']} -> {result['calls']} nuke calls"))
+    return regressions
+
+def format_results(results, baseline):
+    lines = [f"{'case':<52}{'ms':>10}{'calls':>9}{'baseline ms':>13}"]
+    for case, result in results.items():
+        base = baseline.get(case)
+        base_text = f"{base['seconds'] * 1000:.2f}" if base else "-"
+        lines.append(f"{case:<52}{result['seconds'] * 1000:>10.2f}{result['calls']:>9}{base_text:>13}")
+    return "\n".join(lines)
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case, the median is kept")
+    parser.add_argument("--check-time", action="store_true", help="Also flag cases whose median time regressed")
+    parser.add_argument("--threshold", type=float, default=2.0, help="Allowed slowdown factor with --check-time")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="Ignore slowdowns below this many seconds with --check-time")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results = run_benchmarks(args.pattern, args.repeat)
+    print(format_results(results, baseline))
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.check_time, args.threshold, args.min_delta)
+    for case, reason in regressions:
+        print(f"REGRESSION {case}: {reason}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
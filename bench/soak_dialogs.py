@@ -0,0 +1,99 @@
+"""Open the tools' dialogs many times headless and check that memory stays flat.
+
+Usage:
+    python bench/soak_dialogs.py                 # 1000 opens of each dialog
+    python bench/soak_dialogs.py -n 5000 --max-growth 16
+
+Runs against the stand-in nuke and PySide2 modules, so it measures the Python
+side of each open: dialog instances, what they hold on to and the caches they
+fill. Qt's own allocations are not visible here. After a warm-up, memory is
+traced with tracemalloc. The run fails if the traced total grows by more than
+--max-growth bytes per open, or if more than one instance of a dialog class is
+still alive at the end.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [BENCH_DIR, os.path.dirname(BENCH_DIR)]
+
+import fake_nuke
+import fake_qt
+fake_nuke.install()
+fake_qt.install()
+
+import nuke
+import synthetic
+import Shuffle_shift
+import V_shuffle_dropdown
+import V_backdrop_inator
+
+DIALOG_CLASSES = (Shuffle_shift.ChannelButtonPanel, V_shuffle_dropdown.ShuffleDialog, V_backdrop_inator.BackdropCreator)
+
+def open_dialogs(shuffle):
+    """One use of each dialog, as opening them from the menu does."""
+    synthetic.select([shuffle])
+    Shuffle_shift.select_channel_for_shuffle()
+    V_shuffle_dropdown.create_shuffle_ui()
+    V_backdrop_inator.launch_backdrop_creator()
+    # The stand-in's exec_ returns at once, which Shuffle Shift reports as a cancel
+    del nuke.messages[:]
+
+def live_dialogs():
+    return Counter(type(obj).__name__ for obj in gc.get_objects() if isinstance(obj, DIALOG_CLASSES))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--opens", type=int, default=1000, help="Opens of each dialog")
+    parser.add_argument("--warmup", type=int, default=50, help="Opens before tracing starts")
+    parser.add_argument("--max-growth", type=float, default=16.0, help="Allowed growth in bytes per open")
+    args = parser.parse_args(argv)
+
+    nuke.GUI = True
+    script = synthetic.make_script(nodes=2000, tags=0, exr_layers=200, branches=10)
+    shuffles = script["shuffles"]
+
+    # Fills the layer catalog, the palette and the dialogs themselves
+    for i in range(args.warmup):
+        open_dialogs(shuffles[i % len(shuffles)])
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    step = max(1, args.opens // 10)
+    for i in range(args.opens):
+        open_dialogs(shuffles[i % len(shuffles)])
+        if (i + 1) % step == 0:
+            # Only memory that survives a collection is a leak, the stand-in
+            # Qt objects leave short-lived reference cycles behind
+            gc.collect()
+            print(f"{i + 1:>7} opens  {(tracemalloc.get_traced_memory()[0] - start_bytes) / 1024:>8.1f} KB traced")
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - start_bytes
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    opens = args.opens * len(DIALOG_CLASSES)
+    per_open = growth / float(opens)
+    print(f"{opens} dialog opens: {growth / 1024:.1f} KB growth, {per_open:.1f} bytes per open")
+    failed = per_open > args.max_growth
+    if failed:
+        print("Memory grows with every open. Largest growth by line:")
+        for stat in after.compare_to(before, "lineno")[:10]:
+            print(f"  {stat}")
+
+    alive = live_dialogs()
+    print("Live dialogs: " + ", ".join(f"{name} {count}" for name, count in sorted(alive.items())))
+    extra = {name: count for name, count in alive.items() if count > 1}
+    if extra:
+        print(f"More than one instance alive: {extra}")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
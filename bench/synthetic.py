@@ -0,0 +1,87 @@
+"""Synthetic scripts for the benchmarks, built in the fake nuke module.
+
+Call fake_nuke.install() before importing this module.
+"""
+import random
+import nuke
+
+# Distance between generated nodes in the DAG
+GRID_X = 110
+GRID_Y = 60
+
+def layer_names(count):
+    """Returns count render-style layer names (diffuse_001, specular_002, ...)."""
+    kinds = ["diffuse", "specular", "reflect", "refract", "sss", "emission", "light", "crypto"]
+    return [f"{kinds[i % len(kinds)]}_{i:03d}" for i in range(count)]
+
+def make_exr_read(layers=200, name=None, x=0, y=0):
+    """A Read delivering rgba plus layers extra three-channel layers, like a multi-layer EXR."""
+    read = nuke.nodes.Read(name=name, file=f"/renders/beauty_{layers}.####.exr", xpos=x, ypos=y)
+    chans = ["rgba.red", "rgba.green", "rgba.blue", "rgba.alpha"]
+    for layer in layer_names(layers):
+        chans.extend(f"{layer}.{channel}" for channel in ("red", "green", "blue"))
+    nuke.set_channels(read, chans)
+    return read
+
+def make_chain(source, length, node_class="Grade", x=0, y=0):
+    """length nodes wired one below the other under source. Returns the last one."""
+    node = source
+    for i in range(length):
+        node = getattr(nuke.nodes, node_class)(inputs=[node] if node is not None else [],
+                                               xpos=x, ypos=y + (i + 1) * GRID_Y)
+    return node
+
+def make_tags(targets, tags_per_target=1):
+    """Tag_Input style NoOps pointing at targets, with the knobs Tag_input gives them."""
+    tags = []
+    for target in targets:
+        for _ in range(tags_per_target):
+            tag = nuke.nodes.NoOp(name=f"Tag_input{len(tags) + 1}", inputs=[target],
+                                  xpos=target.xpos(), ypos=target.ypos() + GRID_Y)
+            knob = nuke.EvalString_Knob("nc", "Connection name")
+            tag.addKnob(knob)
+            knob.setValue(target.name())
+            tags.append(tag)
+    return tags
+
+def make_script(nodes=10000, tags=500, exr_layers=200, branches=20, seed=1):
+    """
+    Build a production-sized script in the fake nuke module.
+
+    Args:
+        nodes (int): Total node count to reach, spread over branches
+        tags (int): Number of Tag_input nodes, spread over the branch tips
+        exr_layers (int): Extra layers on each branch's Read
+        branches (int): Number of Read -> chain -> Shuffle branches, side by side
+        seed (int): Seed for the random Shuffle layers
+
+    Returns:
+        dict: "reads", "tips" and "shuffles" node lists and "tags"
+    """
+    nuke.clear()
+    rng = random.Random(seed)
+    names = layer_names(exr_layers)
+    reads, tips, shuffles = [], [], []
+    per_branch = max(1, (nodes - tags) // branches - 2)
+    for b in range(branches):
+        x = b * GRID_X * 2
+        read = make_exr_read(exr_layers, x=x)
+        tip = make_chain(read, per_branch, x=x)
+        shuffle = nuke.nodes.Shuffle2(inputs=[tip], xpos=x, ypos=tip.ypos() + GRID_Y)
+        if names:
+            shuffle["in1"].setValue(rng.choice(names))
+        reads.append(read)
+        tips.append(tip)
+        shuffles.append(shuffle)
+    targets = [tips[i % len(tips)] for i in range(tags)]
+    tag_nodes = make_tags(targets)
+    nuke.load_script()
+    nuke.reset_stats()
+    return {"reads": reads, "tips": tips, "shuffles": shuffles, "tags": tag_nodes}
+
+def select(nodes):
+    """Makes nodes the current selection."""
+    for node in nuke.allNodes():
+        node.setSelected(False)
+    for node in nodes:
+        node.setSelected(True)